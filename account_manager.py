@@ -4,7 +4,8 @@ Account Manager for Tinkoff Invest API
 This script provides a simple CLI to create and list Tinkoff Invest accounts
 """
 import argparse
-from bot import TradingBot
+
+from utils.logging_config import setup_logging
 
 def main():
     parser = argparse.ArgumentParser(description='Tinkoff Invest Account Manager')
@@ -13,6 +14,10 @@ def main():
     
     args = parser.parse_args()
     
+    # Imported after argument parsing so --help and usage errors return immediately
+    from bot import TradingBot
+    setup_logging()
+    
     # Initialize the trading bot (which has our account management methods)
     bot = TradingBot()
     
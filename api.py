@@ -3,13 +3,25 @@
 API for the Tinkoff trading bot
 Provides a simple FastAPI server to interact with the trading bot from a web UI
 """
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
 from pydantic import BaseModel
 from bot import TradingBot
+from utils.logging_config import setup_logging
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Logging is configured when the server starts, not when the module is imported
+    setup_logging()
+    yield
+
 
-app = FastAPI(title="Trading Bot API", description="API for managing Tinkoff Invest trading bot")
+app = FastAPI(title="Trading Bot API", description="API for managing Tinkoff Invest trading bot",
+              lifespan=lifespan)
 
 # Enable CORS for the Next.js frontend
 app.add_middleware(
@@ -18,6 +30,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # Initialize the trading bot
@@ -48,5 +61,88 @@ def create_account():
             "message": "In production mode, accounts must be created through the Tinkoff website"
         }
 
+def _chart_response(request, kind, build, figi, interval, fmt, *params):
+    """
+    Serve chart data with ETag revalidation
+    
+    The ETag is derived from the stored file version and the request
+    parameters, so an unchanged chart is answered with 304 before any
+    candles are loaded.
+    """
+    from utils import chart_data
+    
+    version = chart_data.store.version(figi, interval)
+    if version is None:
+        raise HTTPException(status_code=404, detail=f"No {interval} candles stored for {figi}")
+    
+    tag = chart_data.etag(kind, figi, interval, version, fmt, *params)
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == tag:
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        df = build()
+        if fmt == "arrow":
+            return Response(chart_data.to_arrow(df), media_type=chart_data.ARROW_MEDIA_TYPE, headers=headers)
+        return Response(chart_data.to_json(df), media_type="application/json", headers=headers)
+    except chart_data.ChartDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except chart_data.ChartEncoderUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+def _resolve_figi(ticker, figi):
+    from utils import chart_data
+    
+    if not ticker and not figi:
+        raise HTTPException(status_code=400, detail="Either ticker or figi is required")
+    try:
+        return chart_data.resolve_figi(ticker, figi)
+    except chart_data.ChartDataError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/candles")
+def get_candles(
+    request: Request,
+    ticker: Optional[str] = None,
+    figi: Optional[str] = None,
+    interval: str = Query("1m", pattern="^(1m|5m|15m|1h)$"),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    width: Optional[int] = Query(None, gt=0, description="Chart width in pixels; candles are downsampled to fit"),
+    format: str = Query("json", pattern="^(json|arrow)$"),
+):
+    """Stored candles as columnar JSON or an Arrow IPC stream"""
+    from utils import chart_data
+    
+    figi = _resolve_figi(ticker, figi)
+    return _chart_response(
+        request, "candles",
+        lambda: chart_data.candles(figi, interval, start, end, width),
+        figi, interval, format, start, end, width
+    )
+
+@app.get("/signals")
+def get_signals(
+    request: Request,
+    ticker: Optional[str] = None,
+    figi: Optional[str] = None,
+    strategy: str = "mean_reversion",
+    interval: str = Query("1m", pattern="^(1m|5m|15m|1h)$"),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    width: Optional[int] = Query(None, gt=0, description="Chart width in pixels; points are downsampled to fit"),
+    format: str = Query("json", pattern="^(json|arrow)$"),
+):
+    """Strategy indicator overlays and signals over stored candles"""
+    from utils import chart_data
+    
+    figi = _resolve_figi(ticker, figi)
+    return _chart_response(
+        request, "signals",
+        lambda: chart_data.signals(figi, interval, strategy, start, end, width),
+        figi, interval, format, strategy, start, end, width
+    )
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("api:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for Tinkoff Invest trading bot
+Measures import time of the entry point modules and startup time of the
+command line tools, each in a fresh interpreter
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_TARGETS = [
+    "config",
+    "strategies.registry",
+    "bot",
+    "account_manager",
+    "main",
+    "api",
+    "pandas",
+    "tinkoff.invest",
+]
+
+COMMAND_TARGETS = [
+    ["account_manager.py", "--help"],
+    ["main.py", "--help"],
+    ["simulate.py", "--help"],
+]
+
+
+def _run(code_or_args, repeat):
+    """Run a fresh interpreter `repeat` times and return the best wall time, or None on failure"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable] + code_or_args, cwd=ROOT,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            return None
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_imports(repeat):
+    """Import time of each module, net of bare interpreter startup"""
+    baseline = _run(["-c", "pass"], repeat)
+    results = []
+    for module in IMPORT_TARGETS:
+        elapsed = _run(["-c", f"import {module}"], repeat)
+        results.append((f"import {module}", None if elapsed is None else elapsed - baseline))
+    return results
+
+
+def bench_commands(repeat):
+    """Wall time of each command line tool, including interpreter startup"""
+    return [(" ".join(command), _run(command, repeat)) for command in COMMAND_TARGETS]
+
+
+def print_results(title, results):
+    print(title)
+    for name, elapsed in results:
+        value = "unavailable" if elapsed is None else f"{elapsed * 1000:9.1f} ms"
+        print(f"  {name:<40} {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trading bot benchmarks')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+    args = parser.parse_args()
+
+    print_results("Import time (net of interpreter startup)", bench_imports(args.repeat))
+    print_results("Command startup", bench_commands(args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,11 @@
 import logging
 from datetime import datetime, timedelta
-import pandas as pd
-from tinkoff.invest import Client, CandleInterval, OrderDirection, OrderType
-from tinkoff.invest.utils import now
-from tinkoff.invest.constants import INVEST_GRPC_API, INVEST_GRPC_API_SANDBOX
 
 import config
+from utils.logging_config import setup_logging
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.FileHandler("trading_bot.log"), logging.StreamHandler()]
-)
+# pandas and the tinkoff SDK are imported inside the methods that need them,
+# so account management commands start without loading the full stack
 logger = logging.getLogger(__name__)
 
 class TradingBot:
@@ -20,9 +13,14 @@ class TradingBot:
         self.token = config.TINKOFF_TOKEN
         self.sandbox_mode = config.SANDBOX_MODE
         self.ticker = config.TICKER
-        self.target = INVEST_GRPC_API_SANDBOX if self.sandbox_mode else INVEST_GRPC_API
         self.figi = None
         self.account_id = None
+    
+    @property
+    def target(self):
+        """API endpoint for the current mode"""
+        from tinkoff.invest.constants import INVEST_GRPC_API, INVEST_GRPC_API_SANDBOX
+        return INVEST_GRPC_API_SANDBOX if self.sandbox_mode else INVEST_GRPC_API
         
     def run(self):
         """Main bot execution method"""
@@ -33,6 +31,7 @@ class TradingBot:
             logger.error("Tinkoff API token not found. Check your .env file.")
             return
         
+        from tinkoff.invest import Client
         with Client(self.token, target=self.target) as client:
             # Get accounts
             accounts = client.users.get_accounts()
@@ -77,6 +76,7 @@ class TradingBot:
             logger.error("Tinkoff API token not found. Check your .env file.")
             return
         
+        from tinkoff.invest import Client
         with Client(self.token, target=self.target) as client:
             try:
                 if self.sandbox_mode:
@@ -112,6 +112,7 @@ class TradingBot:
             logger.error("Tinkoff API token not found. Check your .env file.")
             return
         
+        from tinkoff.invest import Client
         with Client(self.token, target=self.target) as client:
             try:
                 accounts = client.users.get_accounts()
@@ -142,6 +143,10 @@ class TradingBot:
     
     def get_historical_data(self, client):
         """Get historical candle data"""
+        import pandas as pd
+        from tinkoff.invest import CandleInterval
+        from tinkoff.invest.utils import now
+        
         try:
             logger.info(f"Getting historical data for {self.ticker}")
             
@@ -218,6 +223,8 @@ class TradingBot:
     
     def place_buy_order(self, client):
         """Place a buy order"""
+        from tinkoff.invest import OrderDirection, OrderType
+        
         try:
             # Get portfolio to determine cash available
             portfolio = client.operations.get_portfolio(account_id=self.account_id)
@@ -268,6 +275,8 @@ class TradingBot:
     
     def place_sell_order(self, client):
         """Place a sell order"""
+        from tinkoff.invest import OrderDirection, OrderType
+        
         try:
             # Get positions to determine shares available
             positions = client.operations.get_positions(account_id=self.account_id)
@@ -308,5 +317,6 @@ class TradingBot:
             logger.error(f"Error placing sell order: {e}")
 
 if __name__ == "__main__":
+    setup_logging()
     bot = TradingBot()
     bot.run()
@@ -19,3 +19,76 @@ LOOKBACK_PERIOD = 14  # Number of candles to analyze
 BUY_THRESHOLD = 0.005  # 0.5% price increase to trigger buy
 SELL_THRESHOLD = 0.005  # 0.5% price decrease to trigger sell
 POSITION_SIZE = 0.1  # 10% of available funds per trade
+
+# Local data storage
+CANDLE_STORE_DIR = "data/candles"  # Recorded candles used by the simulator
+
+# Simulated exchange settings
+SIM_INITIAL_CASH = 100000  # RUB credited to each simulated account
+SIM_SLIPPAGE_BPS = 5  # Fixed slippage applied to simulated fills, in basis points
+SIM_COMMISSION_RATE = 0.0005  # 0.05% commission per simulated fill
+SIM_JOURNAL_DIR = "journal/replay"  # Journal of replays, kept apart from live trading events
+
+# Sharded runner settings
+SHARD_WINDOW = 500  # Candles kept in memory per instrument
+SHARD_HEALTH_INTERVAL = 30  # Seconds between worker health reports
+SHARD_RESTART_DELAY = 5  # Seconds to wait before restarting a crashed worker
+
+# Event journal settings
+JOURNAL_DIR = "journal"  # Directory of the structured signal/order journal
+JOURNAL_MAX_BYTES = 50 * 1024 * 1024  # Rotate a day's journal file after 50 MB
+
+# Order pipeline settings
+ORDER_WORKERS = 8  # Orders submitted concurrently
+ORDER_POLL_INTERVAL = 1.0  # Seconds between order state polls
+ORDER_DRAIN_TIMEOUT = 30  # Seconds to wait for open orders when stopping
+ORDER_HISTORY = 10000  # Finished orders remembered for idempotency keys
+
+# Market snapshot settings
+SNAPSHOT_MAX_AGE = 60  # Seconds a price/portfolio snapshot is reused (one tick)
+SNAPSHOT_BATCH_SIZE = 1000  # Maximum FIGIs per last-price request
+
+# Order book settings
+ORDER_BOOK_DEPTHS = (1, 10, 20, 30, 40, 50)  # Depths accepted by the order book subscription
+ORDER_BOOK_DEPTH = 10  # Levels per side, one of ORDER_BOOK_DEPTHS
+ORDER_BOOK_CAPACITY = 4096  # Snapshots kept per instrument in the ring buffer
+ORDER_BOOK_IMBALANCE_LEVELS = 5  # Levels per side summed for the imbalance feature
+ORDER_BOOK_RECONNECT_DELAY = 5  # Seconds to wait before resubscribing after a stream error
+
+# Warm-start checkpoint settings
+CHECKPOINT_DIR = "data/checkpoints"  # Saved state of the continuous bot, one file per ticker and interval
+CHECKPOINT_INTERVAL = 60  # Minimum seconds between checkpoint writes
+CHECKPOINT_MAX_AGE = 24 * 60 * 60  # Checkpoints older than this are ignored on restart
+
+# Multi-account settings
+ACCOUNTS = os.getenv("TINKOFF_ACCOUNTS", "")  # Comma-separated account IDs to trade on, "all", or empty for the first account
+ACCOUNT_POSITION_SIZE = {}  # Per-account overrides of POSITION_SIZE, {account_id: fraction of cash}
+ACCOUNT_MAX_POSITION = {}  # Per-account maximum shares held per instrument, {account_id: shares}
+ACCOUNT_WORKERS = 8  # Accounts sized and ordered concurrently per signal
+
+# Walk-forward evaluation settings
+WALK_FORWARD_TRAIN_DAYS = 20  # Calendar days of history each fold optimizes on
+WALK_FORWARD_TEST_DAYS = 5  # Calendar days each fold is evaluated on out of sample
+WALK_FORWARD_OBJECTIVE = "sharpe"  # In-sample score to maximize: sharpe or return
+WALK_FORWARD_GRIDS = {  # Parameter values searched per strategy
+    "simple_momentum": {
+        "lookback_period": [5, 10, 14, 20, 30],
+        "buy_threshold": [0.002, 0.005, 0.01],
+        "sell_threshold": [0.002, 0.005, 0.01],
+    },
+    "mean_reversion": {
+        "window": [10, 20, 30, 50],
+        "std_dev_threshold": [1.0, 1.5, 2.0, 2.5],
+    },
+}
+
+# Risk engine settings
+RISK_ENABLED = True  # Size buys with the portfolio risk engine
+RISK_LOOKBACK = 1440  # Candles of history used for volatility and correlation
+RISK_TARGET_VOLATILITY = 0.05  # Annualized volatility each position may add, as a fraction of equity
+RISK_MAX_WEIGHT = 0.2  # Maximum share of equity in one instrument
+RISK_MAX_GROSS_EXPOSURE = 1.0  # Maximum gross exposure as a multiple of equity
+RISK_MAX_PORTFOLIO_VOLATILITY = 0.2  # Maximum annualized portfolio volatility after new orders
+RISK_DEFAULT_VOLATILITY = 0.5  # Annualized volatility assumed for instruments without history
+RISK_CASH_BUFFER = 0.003  # Share of order value kept back in cash for commission and slippage
+RISK_REFRESH_INTERVAL = 3600  # Seconds between candle window reports from shard workers to the risk engine
@@ -0,0 +1,317 @@
+"""
+Asynchronous order pipeline with order-state tracking
+
+Orders are submitted from a thread pool over one shared API connection, so
+signal evaluation never waits on an order round trip and many orders can be
+in flight at once. Every order is tracked until it reaches a terminal state
+by polling its order state, and idempotency keys are sent as the API's
+client order ID so a retried submission cannot create a second order.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from utils.journal import get_journal
+
+logger = logging.getLogger(__name__)
+
+BUY = 1
+SELL = 2
+
+PENDING = "pending"
+SUBMITTED = "submitted"
+PARTIALLY_FILLED = "partially_filled"
+FILLED = "filled"
+REJECTED = "rejected"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+TERMINAL_STATES = {FILLED, REJECTED, CANCELLED, FAILED}
+
+# OrderExecutionReportStatus names reported by the API
+EXECUTION_STATES = {
+    "EXECUTION_REPORT_STATUS_NEW": SUBMITTED,
+    "EXECUTION_REPORT_STATUS_PARTIALLYFILL": PARTIALLY_FILLED,
+    "EXECUTION_REPORT_STATUS_FILL": FILLED,
+    "EXECUTION_REPORT_STATUS_REJECTED": REJECTED,
+    "EXECUTION_REPORT_STATUS_CANCELLED": CANCELLED,
+}
+
+_KEY_NAMESPACE = uuid.UUID("5f0c6a4e-6c1b-4c8e-9a59-6f1d1c0b7a11")
+
+
+def _to_float(value):
+    return float(value.units) + float(value.nano) / 1e9 if value is not None else None
+
+
+class TrackedOrder:
+    """Lifecycle of a single order from submission to a terminal state"""
+
+    def __init__(self, key, account_id, figi, quantity, direction, ticker=None):
+        self.key = key
+        # The API accepts a client order ID of at most 36 characters: derive a UUID from the key
+        self.order_id = str(uuid.uuid5(_KEY_NAMESPACE, key))
+        self.account_id = account_id
+        self.figi = figi
+        self.ticker = ticker
+        self.quantity = quantity
+        self.direction = direction
+        self.state = PENDING
+        self.lots_executed = 0
+        self.executed_price = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    @property
+    def is_terminal(self):
+        return self.state in TERMINAL_STATES
+
+    @property
+    def remaining(self):
+        """Quantity that may still be executed"""
+        return 0 if self.is_terminal else self.quantity - self.lots_executed
+
+    def as_dict(self):
+        return {
+            "key": self.key,
+            "order_id": self.order_id,
+            "account_id": self.account_id,
+            "figi": self.figi,
+            "ticker": self.ticker,
+            "direction": "buy" if self.direction == BUY else "sell",
+            "quantity": self.quantity,
+            "lots_executed": self.lots_executed,
+            "executed_price": self.executed_price,
+            "state": self.state,
+            "error": self.error,
+        }
+
+
+class OrderPipeline:
+    """
+    Non-blocking market order submission and tracking
+
+    Args:
+        token (str): API token
+        target (str): API endpoint
+        sandbox (bool): Use sandbox order calls
+        client_factory: Callable returning a client context manager, defaults to tinkoff Client
+        workers (int): Orders submitted concurrently
+        journal: Event journal, defaults to the process-wide journal
+        on_fill: Optional callable(account_id, figi, quantity) called for every fill,
+            with the executed lots signed positive for buys and negative for sells
+    """
+
+    def __init__(self, token, target, sandbox, client_factory=None, workers=None, journal=None,
+                 on_fill=None):
+        self.token = token
+        self.target = target
+        self.sandbox = sandbox
+        self.client_factory = client_factory
+        self.workers = workers or config.ORDER_WORKERS
+        self.journal = journal or get_journal()
+        self.on_fill = on_fill
+        # Every order by key, oldest first, pruned to ORDER_HISTORY; open orders are also indexed in _open
+        self._orders = OrderedDict()
+        self._open = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._client_context = None
+        self._client = None
+        self._executor = None
+        self._poller = None
+
+    def start(self):
+        """Open the pipeline's API connection and start the submit and poll threads"""
+        client_factory = self.client_factory
+        if client_factory is None:
+            from tinkoff.invest import Client
+            client_factory = Client
+
+        self._client_context = client_factory(self.token, target=self.target)
+        self._client = self._client_context.__enter__()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="order-submit")
+        self._poller = threading.Thread(target=self._poll_loop, name="order-poller", daemon=True)
+        self._poller.start()
+        return self
+
+    def stop(self, wait=True):
+        """
+        Stop the pipeline
+
+        Args:
+            wait (bool): Wait for queued submissions and for open orders to reach a
+                terminal state, up to config.ORDER_DRAIN_TIMEOUT seconds
+        """
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=wait)
+        # The poller is stopped before draining, so only this thread polls from here on
+        self._stop.set()
+        self._poller.join()
+        if wait:
+            deadline = time.time() + config.ORDER_DRAIN_TIMEOUT
+            while self.open_orders() and time.time() < deadline:
+                self._poll_once()
+                time.sleep(config.ORDER_POLL_INTERVAL)
+        self._client_context.__exit__(None, None, None)
+        self._executor = None
+
+    # Submission
+
+    def submit(self, account_id, figi, quantity, direction, ticker=None, key=None):
+        """
+        Queue a market order and return immediately
+
+        Args:
+            account_id (str): Account to trade on
+            figi (str): Instrument FIGI
+            quantity (int): Number of lots
+            direction (int): 1 for buy, 2 for sell
+            ticker (str): Ticker, for logging and the journal
+            key (str): Idempotency key; submitting the same key again returns the
+                existing order instead of placing a new one
+
+        Returns:
+            TrackedOrder: The tracked order
+        """
+        if self._executor is None:
+            raise RuntimeError("Order pipeline is not running")
+
+        key = key or str(uuid.uuid4())
+        with self._lock:
+            existing = self._open.get(key) or self._orders.get(key)
+            if existing is not None:
+                return existing
+            order = TrackedOrder(key, account_id, figi, quantity, direction, ticker)
+            self._orders[key] = order
+            self._open[key] = order
+            self._prune()
+
+        self._executor.submit(self._submit, order)
+        return order
+
+    def _submit(self, order):
+        try:
+            params = dict(
+                figi=order.figi,
+                quantity=order.quantity,
+                price=None,  # Market order
+                direction=order.direction,
+                account_id=order.account_id,
+                order_type=2,  # Market order
+                order_id=order.order_id,
+            )
+            if self.sandbox:
+                response = self._client.sandbox.post_sandbox_order(**params)
+            else:
+                response = self._client.orders.post_order(**params)
+        except Exception as e:
+            self._update(order, FAILED, error=str(e))
+            logger.error(f"Order {order.key} for {order.ticker or order.figi} failed: {e}")
+            return
+
+        # The exchange assigns its own order ID, used for state polling
+        order.order_id = response.order_id
+        self.journal.record("order", ticker=order.ticker, figi=order.figi, account_id=order.account_id,
+                            direction="buy" if order.direction == BUY else "sell",
+                            quantity=order.quantity, order_id=order.order_id, key=order.key)
+        logger.info(f"Order {order.order_id} submitted: {order.quantity} x {order.ticker or order.figi}")
+        self._apply_report(order, response)
+
+    # Tracking
+
+    def _poll_loop(self):
+        while not self._stop.wait(config.ORDER_POLL_INTERVAL):
+            self._poll_once()
+
+    def _poll_once(self):
+        for order in self.open_orders():
+            if order.state == PENDING:
+                continue
+            try:
+                if self.sandbox:
+                    state = self._client.sandbox.get_sandbox_order_state(
+                        account_id=order.account_id, order_id=order.order_id)
+                else:
+                    state = self._client.orders.get_order_state(
+                        account_id=order.account_id, order_id=order.order_id)
+            except Exception as e:
+                logger.warning(f"Could not poll order {order.order_id}: {e}")
+                continue
+            self._apply_report(order, state)
+
+    def _apply_report(self, order, report):
+        """Update an order from a PostOrderResponse or OrderState"""
+        status = report.execution_report_status
+        state = EXECUTION_STATES.get(getattr(status, "name", status), SUBMITTED)
+        lots_executed = getattr(report, "lots_executed", 0) or 0
+        # OrderState carries the per-lot price in average_position_price, while
+        # PostOrderResponse reports it as executed_order_price
+        price = _to_float(getattr(report, "average_position_price", None)
+                          or getattr(report, "executed_order_price", None))
+
+        newly_executed = self._update(order, state, lots_executed=lots_executed, executed_price=price)
+        if newly_executed > 0:
+            self.journal.record("fill", ticker=order.ticker, figi=order.figi, account_id=order.account_id,
+                                direction="buy" if order.direction == BUY else "sell",
+                                quantity=newly_executed, price=price, order_id=order.order_id,
+                                commission=_to_float(getattr(report, "executed_commission", None)))
+            if self.on_fill is not None:
+                self.on_fill(order.account_id, order.figi,
+                             newly_executed if order.direction == BUY else -newly_executed)
+        if state != SUBMITTED:
+            logger.info(f"Order {order.order_id} {state}: {lots_executed}/{order.quantity} executed")
+
+    def _update(self, order, state, lots_executed=None, executed_price=None, error=None):
+        """
+        Apply a state change
+
+        Returns:
+            int: Lots executed since the previous update; computed under the lock, so
+            a fill reported by both the submit and the poll thread is counted once
+        """
+        with self._lock:
+            newly_executed = 0
+            if lots_executed is not None:
+                newly_executed = lots_executed - order.lots_executed
+                order.lots_executed = max(lots_executed, order.lots_executed)
+            if not order.is_terminal:
+                order.state = state
+            if executed_price is not None:
+                order.executed_price = executed_price
+            order.error = error
+            order.updated_at = time.time()
+            if order.is_terminal:
+                self._open.pop(order.key, None)
+            return newly_executed
+
+    def _prune(self):
+        """Forget the oldest orders beyond ORDER_HISTORY; open orders stay tracked in _open"""
+        while len(self._orders) > config.ORDER_HISTORY:
+            self._orders.popitem(last=False)
+
+    # State for sizing
+
+    def get(self, key):
+        with self._lock:
+            return self._open.get(key) or self._orders.get(key)
+
+    def open_orders(self, account_id=None, figi=None):
+        """Orders not yet in a terminal state, optionally filtered"""
+        with self._lock:
+            return [
+                order for order in self._open.values()
+                if (account_id is None or order.account_id == account_id)
+                and (figi is None or order.figi == figi)
+            ]
+
+    def pending_quantity(self, account_id, figi, direction):
+        """Lots of an instrument still to be executed in one direction"""
+        return sum(order.remaining for order in self.open_orders(account_id, figi)
+                   if order.direction == direction)
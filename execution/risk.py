@@ -0,0 +1,265 @@
+"""
+Vectorized portfolio risk engine
+
+Holds per-instrument volatility and the correlation matrix of the instrument
+universe as arrays and sizes every candidate buy of a cycle in one step:
+
+1. Each candidate is sized towards a volatility target, so a position's
+   notional is equity * RISK_TARGET_VOLATILITY / volatility, capped at
+   RISK_MAX_WEIGHT of equity and at the caller's per-order limit.
+2. All candidate orders are then scaled by one common factor so that gross
+   exposure, cash and the portfolio volatility implied by the covariance
+   matrix stay within their limits.
+
+Sells reduce risk and are not limited.
+
+The engine is shared by the threads that place orders on different accounts,
+so growing the universe, updating history and sizing all hold one lock.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def _to_float(value):
+    return float(value.units) + float(value.nano) / 1e9
+
+
+def portfolio_holdings(portfolio):
+    """
+    Shares and current prices of the securities in an API portfolio
+
+    Returns:
+        tuple: ({figi: shares}, {figi: price})
+    """
+    positions, prices = {}, {}
+    for position in portfolio.positions:
+        if position.instrument_type == "currency":
+            continue
+        positions[position.figi] = _to_float(position.quantity)
+        current_price = getattr(position, "current_price", None)
+        if current_price is not None:
+            prices[position.figi] = _to_float(current_price)
+    return positions, prices
+
+
+def _annualization(times, bars):
+    """
+    Square root of candles per year
+
+    Candles per trading day are counted on the full days of the history, i.e.
+    every calendar day but the first and the last. A history spanning two days
+    or less, such as the bot's rolling 24 hour window, has no full day and is
+    measured by its elapsed time instead (at least one day).
+    """
+    times = np.asarray(times, dtype="datetime64[ns]")
+    days, counts = np.unique(times.astype("datetime64[D]"), return_counts=True)
+    if len(days) > 2:
+        per_day = counts[1:-1].mean()
+    else:
+        elapsed = (times[-1] - times[0]) / np.timedelta64(1, "D") if len(times) else 0.0
+        per_day = bars / max(elapsed, 1.0)
+    return np.sqrt(252 * per_day)
+
+
+class RiskEngine:
+    """
+    Portfolio risk limits and volatility-targeted sizing
+
+    Args:
+        figis (list): Initial instrument universe; instruments are added on first use
+        lookback (int): Candles of history used for volatility and correlation
+    """
+
+    def __init__(self, figis=(), lookback=None):
+        self.lookback = lookback or config.RISK_LOOKBACK
+        self.target_volatility = config.RISK_TARGET_VOLATILITY
+        self.max_weight = config.RISK_MAX_WEIGHT
+        self.max_gross_exposure = config.RISK_MAX_GROSS_EXPOSURE
+        self.max_portfolio_volatility = config.RISK_MAX_PORTFOLIO_VOLATILITY
+        self.default_volatility = config.RISK_DEFAULT_VOLATILITY
+        self.cash_buffer = config.RISK_CASH_BUFFER
+
+        self.index = {}
+        self.volatility = np.empty(0)
+        self.correlation = np.empty((0, 0))
+        self._covariance = None
+        self.updated_at = None
+        self._lock = threading.Lock()
+        self._ensure(figis)
+
+    # Universe and history
+
+    def _ensure(self, figis):
+        """Add unknown instruments with no volatility estimate and zero correlation"""
+        new = [figi for figi in dict.fromkeys(figis) if figi not in self.index]
+        if not new:
+            return
+        size = len(self.index)
+        for offset, figi in enumerate(new):
+            self.index[figi] = size + offset
+        grown = size + len(new)
+        volatility = np.full(grown, np.nan)
+        volatility[:size] = self.volatility
+        correlation = np.eye(grown)
+        correlation[:size, :size] = self.correlation
+        self.volatility, self.correlation = volatility, correlation
+        self._covariance = None
+
+    def update_history(self, closes):
+        """
+        Re-estimate volatility and correlation of many instruments at once
+
+        Args:
+            closes (pd.DataFrame): Close prices indexed by time, one column per FIGI;
+                missing prices are NaN
+        """
+        closes = closes.iloc[-(self.lookback + 1):]
+        figis = list(closes.columns)
+        if len(closes) < 3:
+            with self._lock:
+                self._ensure(figis)
+            return
+
+        returns = np.diff(np.log(closes.to_numpy(dtype=np.float64)), axis=0)
+        valid = np.isfinite(returns)
+        counts = valid.sum(axis=0)
+        means = np.where(counts > 0, np.nansum(returns, axis=0) / np.maximum(counts, 1), 0.0)
+        centered = np.where(valid, returns - means, 0.0)
+
+        # Pairwise covariance over the candles both instruments traded in
+        mask = valid.astype(np.float64)
+        pairs = mask.T @ mask
+        covariance = (centered.T @ centered) / np.maximum(pairs - 1, 1)
+        std = np.sqrt(np.diag(covariance))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = covariance / np.outer(std, std)
+        correlation = np.clip(np.nan_to_num(correlation), -1.0, 1.0)
+        np.fill_diagonal(correlation, 1.0)
+
+        annualized = std * _annualization(closes.index.values, len(closes))
+        annualized[(counts < 2) | (std == 0)] = np.nan
+
+        with self._lock:
+            self._ensure(figis)
+            columns = np.fromiter((self.index[figi] for figi in figis), dtype=np.int64, count=len(figis))
+            self.volatility[columns] = annualized
+            self.correlation[np.ix_(columns, columns)] = correlation
+            self._covariance = None
+            self.updated_at = time.time()
+
+    def update_instrument(self, figi, candles):
+        """Re-estimate one instrument's volatility from its candle window, keeping its correlations"""
+        candles = candles.iloc[-(self.lookback + 1):]
+        volatility = None
+        if len(candles) >= 3:
+            returns = np.diff(np.log(candles["close"].to_numpy(dtype=np.float64)))
+            std = returns.std(ddof=1)
+            volatility = std * _annualization(candles["time"].values, len(candles)) if std > 0 else np.nan
+        with self._lock:
+            self._ensure([figi])
+            if volatility is not None:
+                self.volatility[self.index[figi]] = volatility
+                self._covariance = None
+
+    def _covariance_matrix(self):
+        """Annualized covariance matrix, with the default volatility where none is estimated"""
+        if self._covariance is None:
+            volatility = np.where(np.isnan(self.volatility), self.default_volatility, self.volatility)
+            self._covariance = self.correlation * np.outer(volatility, volatility)
+        return self._covariance
+
+    # Sizing
+
+    def size_buys(self, figis, prices, cash, positions, max_notional=None):
+        """
+        Size every candidate buy of a cycle against the whole portfolio
+
+        Args:
+            figis (list): Candidate instruments to buy
+            prices (dict): Last price per FIGI for the candidates and held instruments
+            cash (float): Cash available to the account
+            positions (dict): Shares held per FIGI
+            max_notional (float or list): Per-order notional cap, e.g. cash * POSITION_SIZE
+
+        Returns:
+            tuple: (np.ndarray of shares to buy per candidate, 0 where limits leave no
+            room; dict report of equity, exposure, portfolio volatility and scale)
+        """
+        with self._lock:
+            return self._size_buys(figis, prices, cash, positions, max_notional)
+
+    def _size_buys(self, figis, prices, cash, positions, max_notional):
+        started = time.perf_counter()
+        self._ensure(list(figis) + list(positions))
+        size = len(self.index)
+        index = self.index
+
+        held = np.zeros(size)
+        for figi, quantity in positions.items():
+            held[index[figi]] = quantity
+        price = np.full(size, np.nan)
+        for figi, value in prices.items():
+            column = index.get(figi)
+            if column is not None:
+                price[column] = value
+
+        exposure = held * np.nan_to_num(price)
+        equity = cash + exposure.sum()
+        candidates = np.fromiter((index[figi] for figi in figis), dtype=np.int64, count=len(figis))
+        candidate_price = price[candidates]
+        if equity <= 0 or not len(candidates):
+            return np.zeros(len(candidates), dtype=np.int64), {"equity": float(equity), "scale": 0.0,
+                                                              "candidates": len(candidates)}
+
+        # Volatility-targeted notional per candidate, net of what is already held
+        volatility = np.where(np.isnan(self.volatility), self.default_volatility, self.volatility)
+        target = equity * np.minimum(self.target_volatility / volatility[candidates], self.max_weight)
+        desired = np.maximum(target - exposure[candidates], 0.0)
+        if max_notional is not None:
+            desired = np.minimum(desired, max_notional)
+        desired[~(candidate_price > 0)] = 0.0
+
+        delta = np.zeros(size)
+        np.add.at(delta, candidates, desired)
+        total = delta.sum()
+
+        # Portfolio variance of weights + k * change is c + 2bk + ak^2
+        covariance = self._covariance_matrix()
+        weights, change = exposure / equity, delta / equity
+        shared = covariance @ change
+        a, b, c = change @ shared, weights @ shared, weights @ covariance @ weights
+
+        # One scale factor for all candidates keeps their relative sizes
+        scale = 1.0
+        if total > 0:
+            gross_room = self.max_gross_exposure * equity - np.abs(exposure).sum()
+            # Orders pay commission and slippage on top of their notional
+            spendable = max(cash, 0.0) / (1 + self.cash_buffer)
+            scale = min(scale, max(gross_room, 0.0) / total, spendable / total)
+            limit = self.max_portfolio_volatility ** 2
+            if a > 0 and c + 2 * b * scale + a * scale * scale > limit:
+                # Largest k that keeps the variance within the limit
+                discriminant = b * b - a * (c - limit)
+                scale = min(scale, max((-b + np.sqrt(discriminant)) / a, 0.0) if discriminant >= 0 else 0.0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            quantities = np.where(candidate_price > 0, np.floor(scale * desired / candidate_price), 0)
+
+        report = {
+            "equity": float(equity),
+            "gross_exposure": float(np.abs(exposure).sum() / equity),
+            "portfolio_volatility": float(np.sqrt(max(c, 0.0))),
+            "portfolio_volatility_after": float(np.sqrt(max(c + 2 * b * scale + a * scale * scale, 0.0))),
+            "scale": float(scale),
+            "candidates": len(candidates),
+            "elapsed_ms": (time.perf_counter() - started) * 1000,
+        }
+        logger.debug(f"Risk sizing of {len(candidates)} candidates over {size} instruments: {report}")
+        return quantities.astype(np.int64), report
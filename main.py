@@ -3,28 +3,24 @@ Main application for Tinkoff Invest Trading Bot
 """
 import logging
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import argparse
 
-from tinkoff.invest import Client, CandleInterval
-from tinkoff.invest.utils import now
-from tinkoff.invest.constants import INVEST_GRPC_API, INVEST_GRPC_API_SANDBOX
-
 import config
-from utils.helpers import convert_candles_to_dataframe
-from strategies.momentum.momentum_strategy import MomentumStrategy
-from strategies.mean_reversion.mean_reversion_strategy import MeanReversionStrategy
+from execution.order_pipeline import BUY, SELL, OrderPipeline
+from strategies.registry import DEFAULT_STRATEGY, STRATEGIES, create_strategy, default_params, strategy_names
+from utils.journal import get_journal
+from utils.logging_config import setup_logging
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.FileHandler("trading_bot.log"), logging.StreamHandler()]
-)
+# The tinkoff SDK, pandas and strategy modules are imported on first use
 logger = logging.getLogger(__name__)
 
 class TradingBot:
-    def __init__(self, strategy_name=None, ticker=None, interval=None, sandbox=None):
+    def __init__(self, strategy_name=None, ticker=None, interval=None, sandbox=None, client_factory=None,
+                 journal=None, order_pipeline=None, snapshot=None, order_book_depth=None,
+                 checkpoint=None, accounts=None, risk=None, clock=None):
         # Override config with command line arguments if provided
         self.token = config.TINKOFF_TOKEN
         self.sandbox_mode = sandbox if sandbox is not None else config.SANDBOX_MODE
@@ -32,28 +28,54 @@ class TradingBot:
         self.candle_interval = interval or config.CANDLE_INTERVAL
         self.strategy_name = strategy_name or config.STRATEGY
         
-        self.target = INVEST_GRPC_API_SANDBOX if self.sandbox_mode else INVEST_GRPC_API
+        # Callable returning a client context manager; a SimulatedExchange can be plugged in here
+        self.client_factory = client_factory
+        # Callable returning the current UTC datetime; a SimulatedExchange supplies its own clock
+        self.clock = clock
+        self.journal = journal or get_journal()
+        # When set, orders are submitted asynchronously and tracked until filled
+        self.order_pipeline = order_pipeline
+        # When set, sizing reads prices and cash from a shared per-tick MarketSnapshot
+        self.snapshot = snapshot
+        # When set, the instrument's order book is streamed into a ring buffer seen by the strategy
+        self.order_book_depth = order_book_depth
+        self.order_book_stream = None
+        # Warm-start Checkpoint; created by run() in continuous mode when not given
+        self.checkpoint = checkpoint
+        # RiskEngine sizing buys against the whole portfolio; False disables it
+        if risk is None and config.RISK_ENABLED:
+            from execution.risk import RiskEngine
+            risk = RiskEngine()
+        self.risk = risk or None
+        # Run ID and cycle number make order idempotency keys unique across restarts
+        self.run_id = uuid.uuid4().hex[:12]
+        self.cycle = 0
         self.figi = None
+        # Accounts to trade on: explicit IDs, ["all"], or empty for the first account only
+        self.accounts = accounts if accounts is not None else \
+            [account.strip() for account in config.ACCOUNTS.split(",") if account.strip()]
+        self.account_ids = []
+        # First selected account, used where a single account is needed
         self.account_id = None
+        self.instrument_name = None
+        # Candle window kept between cycles so each cycle only fetches new candles
+        self.candles = None
         self.strategy = self._initialize_strategy()
+    
+    @property
+    def target(self):
+        """API endpoint for the current mode"""
+        from tinkoff.invest.constants import INVEST_GRPC_API, INVEST_GRPC_API_SANDBOX
+        return INVEST_GRPC_API_SANDBOX if self.sandbox_mode else INVEST_GRPC_API
 
     def _initialize_strategy(self):
         """Initialize selected trading strategy"""
-        strategy_params = {
-            'lookback_period': config.LOOKBACK_PERIOD,
-            'buy_threshold': config.BUY_THRESHOLD,
-            'sell_threshold': config.SELL_THRESHOLD,
-            'window': 20,  # For mean reversion
-            'std_dev_threshold': 1.5  # For mean reversion
-        }
+        strategy_params = default_params()
         
-        if self.strategy_name == "simple_momentum":
-            return MomentumStrategy(strategy_params)
-        elif self.strategy_name == "mean_reversion":
-            return MeanReversionStrategy(strategy_params)
-        else:
+        if self.strategy_name not in STRATEGIES:
             logger.warning(f"Unknown strategy '{self.strategy_name}', defaulting to momentum")
-            return MomentumStrategy(strategy_params)
+            return create_strategy(DEFAULT_STRATEGY, strategy_params)
+        return create_strategy(self.strategy_name, strategy_params)
         
     def run(self, continuous=False, interval_minutes=15):
         """
@@ -72,71 +94,230 @@ class TradingBot:
             logger.error("Tinkoff API token not found. Check your .env file.")
             return
         
-        # Run once or continuously based on parameter
-        if continuous:
-            logger.info(f"Running in continuous mode with {interval_minutes} minute interval")
-            while True:
+        owns_pipeline = self.order_pipeline is None
+        if owns_pipeline:
+            self.order_pipeline = OrderPipeline(
+                self.token, self.target, self.sandbox_mode, client_factory=self.client_factory,
+                journal=self.journal,
+                on_fill=self.snapshot.apply_fill if self.snapshot is not None else None).start()
+        
+        if continuous and self.checkpoint is None and config.CHECKPOINT_DIR:
+            from utils.checkpoint import Checkpoint, checkpoint_path
+            self.checkpoint = Checkpoint(checkpoint_path(self.ticker, self.candle_interval))
+        if self.checkpoint is not None:
+            self._restore_checkpoint()
+        
+        try:
+            # Run once or continuously based on parameter
+            if continuous:
+                logger.info(f"Running in continuous mode with {interval_minutes} minute interval")
+                while True:
+                    self._execute_trading_cycle()
+                    self._save_checkpoint()
+                    logger.info(f"Waiting {interval_minutes} minutes until next trading cycle...")
+                    time.sleep(interval_minutes * 60)
+            else:
                 self._execute_trading_cycle()
-                logger.info(f"Waiting {interval_minutes} minutes until next trading cycle...")
-                time.sleep(interval_minutes * 60)
-        else:
-            self._execute_trading_cycle()
+        finally:
+            self._save_checkpoint(force=True)
+            if self.order_book_stream is not None:
+                self.order_book_stream.stop()
+                self.order_book_stream = None
+            if owns_pipeline:
+                # Wait for open orders so their outcome is logged and journaled
+                self.order_pipeline.stop(wait=True)
+                self.order_pipeline = None
     
     def _execute_trading_cycle(self):
         """Execute a single trading cycle"""
+        started = time.perf_counter()
+        self.cycle += 1
         try:
-            with Client(self.token, target=self.target) as client:
+            client_factory = self.client_factory
+            if client_factory is None:
+                from tinkoff.invest import Client
+                client_factory = Client
+            
+            with client_factory(self.token, target=self.target) as client:
                 # Initialize account and instrument
                 if not self._initialize_trading(client):
                     return
+                if self.order_book_depth and self.order_book_stream is None:
+                    self._start_order_book_stream()
                 
                 # Get historical data
                 candles = self._get_historical_data(client)
-                if not candles or len(candles) == 0:
+                if candles is None or len(candles) == 0:
                     logger.warning("No candle data received, skipping trading cycle")
                     return
+                fetched = time.perf_counter()
+                if self.risk is not None:
+                    self.risk.update_instrument(self.figi, candles)
                 
                 # Analyze data using selected strategy
                 signal = self.strategy.generate_signal(candles)
+                evaluated = time.perf_counter()
+                self.journal.record("signal", ticker=self.ticker, figi=self.figi,
+                                    strategy=self.strategy_name, signal=int(signal),
+                                    close=float(candles["close"].iloc[-1]),
+                                    book=self.strategy.order_book_features())
                 
                 # Execute trades based on analysis
-                if signal > 0:
-                    logger.info("BUY signal received")
-                    self._place_buy_order(client)
-                elif signal < 0:
-                    logger.info("SELL signal received")
-                    self._place_sell_order(client)
-                else:
-                    logger.info("No trading signal detected")
+                self._execute_signal(client, signal)
+                
+                self.journal.record("cycle", ticker=self.ticker, candles=len(candles),
+                                    fetch_ms=(fetched - started) * 1000,
+                                    signal_ms=(evaluated - fetched) * 1000,
+                                    total_ms=(time.perf_counter() - started) * 1000)
                 
         except Exception as e:
             logger.error(f"Error in trading cycle: {e}")
     
-    def _initialize_trading(self, client):
-        """Initialize account and get instrument information"""
+    def _execute_signal(self, client, signal, quantities=None):
+        """
+        Act on a signal on every selected account
+        
+        The signal is computed once; sizing and placement run concurrently per
+        account, and an error on one account does not affect the others.
+        
+        Args:
+            client: API client
+            signal (int): 1 for buy, -1 for sell, 0 for no action
+            quantities (dict): Pre-sized buy quantity per account; accounts without
+                one are sized per order
+        """
+        if signal > 0:
+            logger.info(f"BUY signal received for {self.ticker}")
+            place_order = self._place_buy_order
+        elif signal < 0:
+            logger.info(f"SELL signal received for {self.ticker}")
+            place_order = self._place_sell_order
+        else:
+            logger.info("No trading signal detected")
+            return
+        
+        def place(account_id):
+            if quantities is None:
+                return place_order(client, account_id)
+            return place_order(client, account_id, quantity=quantities.get(account_id))
+        
+        if len(self.account_ids) <= 1:
+            place(self.account_id)
+            return
+        
+        workers = min(config.ACCOUNT_WORKERS, len(self.account_ids))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="account") as executor:
+            futures = {executor.submit(place, account_id): account_id for account_id in self.account_ids}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Error placing order on account {futures[future]}: {e}")
+    
+    def _start_order_book_stream(self):
+        """Stream the traded instrument's order book and attach its ring buffer to the strategy"""
+        from orderbook.stream import OrderBookStream
+        
+        self.order_book_stream = OrderBookStream(self.token, self.target, [self.figi],
+                                                 depth=self.order_book_depth).start()
+        self.strategy.order_book = self.order_book_stream.book(self.figi)
+        logger.info(f"Streaming {self.ticker} order book with depth {self.order_book_stream.depth}")
+    
+    def _checkpoint_state(self):
+        """Live state written to the warm-start checkpoint"""
+        return {
+            "ticker": self.ticker,
+            "interval": self.candle_interval,
+            "sandbox": self.sandbox_mode,
+            "strategy": self.strategy_name,
+            "accounts": self.accounts,
+            "account_ids": self.account_ids,
+            "figi": self.figi,
+            "instrument_name": self.instrument_name,
+            "candles": self.candles,
+            "strategy_state": self.strategy.get_state(),
+        }
+    
+    def _save_checkpoint(self, force=False):
+        """Checkpoint live state, at most every CHECKPOINT_INTERVAL seconds unless forced"""
+        if self.checkpoint is None or self.figi is None:
+            return
+        try:
+            if force:
+                self.checkpoint.save(self._checkpoint_state())
+            else:
+                self.checkpoint.save_if_due(self._checkpoint_state())
+        except Exception as e:
+            logger.error(f"Error saving checkpoint: {e}")
+    
+    def _restore_checkpoint(self):
+        """
+        Restore account, instrument, candle window and strategy state from the checkpoint
+        
+        Returns:
+            bool: True if a matching checkpoint was restored
+        """
+        state = self.checkpoint.load()
+        if state is None:
+            return False
+        if (state["ticker"], state["interval"], state["sandbox"]) != \
+                (self.ticker, self.candle_interval, self.sandbox_mode):
+            logger.info("Checkpoint is for a different ticker, interval or mode, starting cold")
+            return False
+        
+        if state["accounts"] == self.accounts:
+            self.account_ids = state["account_ids"]
+            self.account_id = self.account_ids[0] if self.account_ids else None
+        self.figi = state["figi"]
+        self.instrument_name = state["instrument_name"]
+        self.candles = state["candles"]
+        if state["strategy"] == self.strategy_name:
+            self.strategy.set_state(state["strategy_state"])
+        candles = 0 if self.candles is None else len(self.candles)
+        logger.info(f"Restored checkpoint: {len(self.account_ids)} accounts, {self.ticker} ({self.figi}), "
+                    f"{candles} candles")
+        return True
+    
+    def _initialize_trading(self, client, resolve_instrument=True):
+        """
+        Initialize accounts and get instrument information
+        
+        Args:
+            client: API client
+            resolve_instrument (bool): Also resolve the ticker's FIGI; the sharded runner's
+                order router trades many instruments and only needs the accounts
+        """
         try:
-            # Get accounts
-            accounts = client.users.get_accounts()
-            if not accounts.accounts:
-                logger.error("No accounts found")
-                return False
+            # Accounts and FIGI are resolved once per run, or restored from a checkpoint
+            if not self.account_ids:
+                # Get accounts
+                accounts = client.users.get_accounts()
+                if not accounts.accounts:
+                    logger.error("No accounts found")
+                    return False
                 
-            self.account_id = accounts.accounts[0].id
-            logger.info(f"Using account: {self.account_id}")
+                self.account_ids = self._select_accounts([account.id for account in accounts.accounts])
+                if not self.account_ids:
+                    logger.error("None of the configured accounts were found")
+                    return False
+                self.account_id = self.account_ids[0]
+                logger.info(f"Using accounts: {', '.join(self.account_ids)}")
             
-            # Get instrument FIGI
-            instruments = client.instruments.find_instrument(query=self.ticker)
-            if not instruments.instruments:
-                logger.error(f"Instrument {self.ticker} not found")
-                return False
+            if resolve_instrument and self.figi is None:
+                # Get instrument FIGI
+                instruments = client.instruments.find_instrument(query=self.ticker)
+                if not instruments.instruments:
+                    logger.error(f"Instrument {self.ticker} not found")
+                    return False
                 
-            self.figi = instruments.instruments[0].figi
-            instrument_name = instruments.instruments[0].name
-            logger.info(f"Found instrument: {instrument_name} ({self.ticker}) with FIGI {self.figi}")
+                self.figi = instruments.instruments[0].figi
+                self.instrument_name = instruments.instruments[0].name
+                logger.info(f"Found instrument: {self.instrument_name} ({self.ticker}) with FIGI {self.figi}")
             
             # If in sandbox mode, ensure we have funds
             if self.sandbox_mode:
-                self._ensure_sandbox_balance(client)
+                for account_id in self.account_ids:
+                    self._ensure_sandbox_balance(client, account_id)
             
             return True
             
@@ -144,11 +325,31 @@ class TradingBot:
             logger.error(f"Error initializing trading: {e}")
             return False
     
-    def _ensure_sandbox_balance(self, client):
+    def _select_accounts(self, available):
+        """
+        Account IDs to trade on
+        
+        Args:
+            available (list): IDs returned by get_accounts
+        
+        Returns:
+            list: Configured IDs that exist, every ID for ["all"], or the first one by default
+        """
+        if not self.accounts:
+            return available[:1]
+        if self.accounts == ["all"]:
+            return available
+        missing = [account_id for account_id in self.accounts if account_id not in available]
+        if missing:
+            logger.warning(f"Accounts not found and skipped: {', '.join(missing)}")
+        return [account_id for account_id in self.accounts if account_id in available]
+    
+    def _ensure_sandbox_balance(self, client, account_id=None):
         """Ensure we have sufficient funds in sandbox mode"""
+        account_id = account_id or self.account_id
         try:
             # Get current balance
-            portfolio = client.sandbox.get_sandbox_portfolio(account_id=self.account_id)
+            portfolio = client.sandbox.get_sandbox_portfolio(account_id=account_id)
             positions = portfolio.positions
             
             # Check if we need to add funds
@@ -162,9 +363,9 @@ class TradingBot:
             
             # Add sandbox balance if needed
             if not has_sufficient_funds:
-                logger.info("Adding funds to sandbox account")
+                logger.info(f"Adding funds to sandbox account {account_id}")
                 client.sandbox.sandbox_pay_in(
-                    account_id=self.account_id,
+                    account_id=account_id,
                     amount={"units": 100000, "nano": 0},
                 )
                 logger.info("Added 100,000 RUB to sandbox account")
@@ -173,13 +374,31 @@ class TradingBot:
             logger.error(f"Error ensuring sandbox balance: {e}")
     
     def _get_historical_data(self, client):
-        """Get historical candle data"""
+        """
+        Get historical candle data
+        
+        The last day of candles is kept between calls (and in the checkpoint),
+        so after the first call only candles since the last stored one are requested.
+        """
+        import pandas as pd
+        from tinkoff.invest import CandleInterval
+        from tinkoff.invest.utils import now
+        from utils.candle_store import CANDLE_COLUMNS
+        from utils.helpers import convert_candles_to_dataframe
+        
         try:
             logger.info(f"Getting historical data for {self.ticker}")
             
             # Calculate time range for historical data
-            to_time = now()
-            from_time = to_time - timedelta(days=1)
+            to_time = self.clock() if self.clock is not None else now()
+            window_start = to_time - timedelta(days=1)
+            from_time = window_start
+            cached = self.candles
+            if cached is not None and len(cached) and cached["time"].iloc[-1] > window_start:
+                # Fetch only the gap; the last stored candle is refetched as it may have been incomplete
+                from_time = cached["time"].iloc[-1].to_pydatetime()
+            else:
+                cached = None
             
             # Set candle interval based on config
             interval_map = {
@@ -201,41 +420,103 @@ class TradingBot:
             # Convert to pandas DataFrame for analysis
             df = convert_candles_to_dataframe(candles_response.candles)
             logger.info(f"Received {len(df)} candles")
-            return df
+            if len(df):
+                df = df[CANDLE_COLUMNS]
+            if cached is not None:
+                df = pd.concat([cached, df], ignore_index=True) if len(df) else cached
+                df = df.drop_duplicates(subset="time", keep="last")
+                df = df[df["time"] >= window_start].reset_index(drop=True)
+            
+            # Strategies add indicator columns to the frame they get, so they get a copy
+            self.candles = df
+            return df.copy()
         
         except Exception as e:
             logger.error(f"Error getting historical data: {e}")
             return None
     
-    def _place_buy_order(self, client):
-        """Place a buy order"""
+    def _place_buy_order(self, client, account_id=None, quantity=None):
+        """
+        Place a buy order
+        
+        Args:
+            client: API client
+            account_id (str): Account to buy on, defaults to the first selected account
+            quantity (int): Shares already sized by the caller; sized here when None
+        """
+        account_id = account_id or self.account_id
         try:
-            # Get portfolio to determine cash available
-            if self.sandbox_mode:
-                portfolio = client.sandbox.get_sandbox_portfolio(account_id=self.account_id)
-            else:
-                portfolio = client.operations.get_portfolio(account_id=self.account_id)
-            
-            # Get current price
-            last_price_response = client.market_data.get_last_prices(figi=[self.figi])
-            if not last_price_response.last_prices:
-                logger.error("Could not get current price")
+            # Don't size a new buy while an earlier one is still open: cash would be counted twice
+            if self.order_pipeline is not None and \
+                    self.order_pipeline.pending_quantity(account_id, self.figi, BUY):
+                logger.info(f"Buy order already pending on {account_id}, skipping")
                 return
+            
+            if self.snapshot is not None and self.snapshot.has(self.figi, account_id):
+                # Price and cash from this tick's batched snapshot
+                last_price = self.snapshot.last_price(self.figi)
+                cash = self.snapshot.cash(account_id)
+                portfolio = self.snapshot.portfolios[account_id]
+            else:
+                # Get portfolio to determine cash available
+                if self.sandbox_mode:
+                    portfolio = client.sandbox.get_sandbox_portfolio(account_id=account_id)
+                else:
+                    portfolio = client.operations.get_portfolio(account_id=account_id)
+                
+                # Get current price
+                last_price_response = client.market_data.get_last_prices(figi=[self.figi])
+                if not last_price_response.last_prices:
+                    logger.error("Could not get current price")
+                    return
+                    
+                last_price = float(last_price_response.last_prices[0].price.units) + \
+                            float(last_price_response.last_prices[0].price.nano) / 1e9
                 
-            last_price = float(last_price_response.last_prices[0].price.units) + \
-                        float(last_price_response.last_prices[0].price.nano) / 1e9
+                cash = 0
+                for position in portfolio.positions:
+                    if position.instrument_type == "currency":
+                        cash += float(position.quantity.units) + float(position.quantity.nano) / 1e9
             
-            # Calculate quantity to buy
-            cash = 0
-            for position in portfolio.positions:
-                if position.instrument_type == "currency":
-                    cash += float(position.quantity.units) + float(position.quantity.nano) / 1e9
+            if quantity is None:
+                # Calculate quantity to buy with the account's position-size rules
+                order_amount = cash * config.ACCOUNT_POSITION_SIZE.get(account_id, config.POSITION_SIZE)
+                quantity = int(order_amount / last_price)
+                
+                if self.risk is not None and quantity > 0:
+                    from execution.risk import portfolio_holdings
+                    
+                    # Exposure, volatility and correlation limits against the whole portfolio
+                    positions, prices = portfolio_holdings(portfolio)
+                    if self.snapshot is not None:
+                        prices.update(self.snapshot.prices)
+                    prices[self.figi] = last_price
+                    quantities, report = self.risk.size_buys([self.figi], prices, cash, positions,
+                                                             max_notional=order_amount)
+                    quantity = int(quantities[0])
+                    self.journal.record("risk", account_id=account_id, figi=self.figi, quantity=quantity,
+                                        **report)
             
-            order_amount = cash * config.POSITION_SIZE
-            quantity = int(order_amount / last_price)
+            max_position = config.ACCOUNT_MAX_POSITION.get(account_id)
+            if max_position is not None and quantity > 0:
+                held = self._position_quantity(client, account_id)
+                if self.order_pipeline is not None:
+                    held += self.order_pipeline.pending_quantity(account_id, self.figi, BUY)
+                quantity = min(quantity, max_position - held)
             
             if quantity <= 0:
-                logger.warning("Insufficient funds for buy order")
+                logger.warning(f"No room for a buy order on {account_id} (funds, position or risk limits)")
+                return
+            
+            if self.snapshot is not None:
+                self.snapshot.commit_cash(account_id, quantity * last_price)
+            
+            # Hand the order to the pipeline without waiting for the round trip
+            if self.order_pipeline is not None:
+                order = self.order_pipeline.submit(account_id, self.figi, quantity, BUY,
+                                                   ticker=self.ticker, key=self._order_key(account_id, BUY))
+                logger.info(f"Buy order queued on {account_id}: {quantity} shares at ~{last_price:.2f} "
+                            f"(key {order.key})")
                 return
             
             # Place order
@@ -245,7 +526,7 @@ class TradingBot:
                     quantity=quantity,
                     price=None,  # Market order
                     direction=1,  # Buy
-                    account_id=self.account_id,
+                    account_id=account_id,
                     order_type=2  # Market order
                 )
             else:
@@ -254,34 +535,58 @@ class TradingBot:
                     quantity=quantity,
                     price=None,  # Market order
                     direction=1,  # Buy
-                    account_id=self.account_id,
+                    account_id=account_id,
                     order_type=2  # Market order
                 )
             
-            logger.info(f"Buy order placed: {quantity} shares at ~{last_price:.2f}")
+            logger.info(f"Buy order placed on {account_id}: {quantity} shares at ~{last_price:.2f}")
             logger.info(f"Order ID: {order_response.order_id}")
+            self._journal_order(account_id, "buy", quantity, order_response, last_price)
             
         except Exception as e:
-            logger.error(f"Error placing buy order: {e}")
+            logger.error(f"Error placing buy order on {account_id}: {e}")
     
-    def _place_sell_order(self, client):
-        """Place a sell order"""
+    def _position_quantity(self, client, account_id):
+        """Shares of the instrument held by an account, from the snapshot when available"""
+        if self.snapshot is not None and self.snapshot.has(self.figi, account_id):
+            return self.snapshot.position(account_id, self.figi)
+        
+        # Get positions to determine shares available
+        if self.sandbox_mode:
+            positions = client.sandbox.get_sandbox_positions(account_id=account_id)
+        else:
+            positions = client.operations.get_positions(account_id=account_id)
+        
+        # Find position for our instrument
+        for position in positions.securities:
+            if position.figi == self.figi:
+                return position.balance
+        return 0
+    
+    def _place_sell_order(self, client, account_id=None):
+        """
+        Place a sell order
+        
+        Args:
+            client: API client
+            account_id (str): Account to sell on, defaults to the first selected account
+        """
+        account_id = account_id or self.account_id
         try:
-            # Get positions to determine shares available
-            if self.sandbox_mode:
-                positions = client.sandbox.get_sandbox_positions(account_id=self.account_id)
-            else:
-                positions = client.operations.get_positions(account_id=self.account_id)
+            quantity = self._position_quantity(client, account_id)
             
-            # Find position for our instrument
-            quantity = 0
-            for position in positions.securities:
-                if position.figi == self.figi:
-                    quantity = position.balance
-                    break
+            # Shares already being sold by open orders are not available again
+            if self.order_pipeline is not None:
+                quantity -= self.order_pipeline.pending_quantity(account_id, self.figi, SELL)
             
             if quantity <= 0:
-                logger.warning("No shares to sell")
+                logger.warning(f"No shares to sell on {account_id}")
+                return
+            
+            if self.order_pipeline is not None:
+                order = self.order_pipeline.submit(account_id, self.figi, quantity, SELL,
+                                                   ticker=self.ticker, key=self._order_key(account_id, SELL))
+                logger.info(f"Sell order queued on {account_id}: {quantity} shares (key {order.key})")
                 return
             
             # Place order
@@ -291,7 +596,7 @@ class TradingBot:
                     quantity=quantity,
                     price=None,  # Market order
                     direction=2,  # Sell
-                    account_id=self.account_id,
+                    account_id=account_id,
                     order_type=2  # Market order
                 )
             else:
@@ -300,20 +605,41 @@ class TradingBot:
                     quantity=quantity,
                     price=None,  # Market order
                     direction=2,  # Sell
-                    account_id=self.account_id,
+                    account_id=account_id,
                     order_type=2  # Market order
                 )
             
-            logger.info(f"Sell order placed: {quantity} shares")
+            logger.info(f"Sell order placed on {account_id}: {quantity} shares")
             logger.info(f"Order ID: {order_response.order_id}")
+            self._journal_order(account_id, "sell", quantity, order_response)
             
         except Exception as e:
-            logger.error(f"Error placing sell order: {e}")
+            logger.error(f"Error placing sell order on {account_id}: {e}")
+    
+    def _order_key(self, account_id, direction):
+        """Idempotency key: one order per account, instrument, direction and cycle"""
+        return f"{account_id}:{self.figi}:{direction}:{self.run_id}:{self.cycle}"
+    
+    def _journal_order(self, account_id, direction, quantity, order_response, price=None):
+        """Record a placed order, and its fill if the response reports executed lots"""
+        self.journal.record("order", ticker=self.ticker, figi=self.figi, account_id=account_id,
+                            direction=direction, quantity=quantity, price=price,
+                            order_id=order_response.order_id)
+        
+        lots_executed = getattr(order_response, "lots_executed", 0)
+        if lots_executed:
+            executed_price = order_response.executed_order_price
+            commission = getattr(order_response, "executed_commission", None)
+            self.journal.record("fill", ticker=self.ticker, figi=self.figi, account_id=account_id,
+                                direction=direction, quantity=lots_executed,
+                                price=float(executed_price.units) + float(executed_price.nano) / 1e9,
+                                commission=float(commission.units) + float(commission.nano) / 1e9 if commission else None,
+                                order_id=order_response.order_id)
 
 def parse_arguments():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(description='Tinkoff Invest Trading Bot')
-    parser.add_argument('--strategy', type=str, choices=['simple_momentum', 'mean_reversion'],
+    parser.add_argument('--strategy', type=str, choices=strategy_names(),
                         help='Trading strategy to use')
     parser.add_argument('--ticker', type=str, help='Ticker symbol to trade')
     parser.add_argument('--interval', type=str, choices=['1m', '5m', '15m', '1h'],
@@ -322,17 +648,42 @@ def parse_arguments():
     parser.add_argument('--continuous', action='store_true', help='Run continuously')
     parser.add_argument('--cycle-minutes', type=int, default=15,
                         help='Minutes between trading cycles in continuous mode')
+    parser.add_argument('--tickers', type=str,
+                        help='Comma-separated ticker universe for the sharded streaming runner')
+    parser.add_argument('--workers', type=int,
+                        help='Worker processes for the sharded runner (default: CPU count)')
+    parser.add_argument('--accounts', type=str,
+                        help="Comma-separated account IDs to trade on, or 'all' (default: first account)")
+    parser.add_argument('--order-book', type=int, nargs='?', const=config.ORDER_BOOK_DEPTH,
+                        choices=config.ORDER_BOOK_DEPTHS, metavar='DEPTH',
+                        help='Stream the order book and expose depth features to the strategy '
+                             f"(depth {', '.join(map(str, config.ORDER_BOOK_DEPTHS))})")
     
     return parser.parse_args()
 
 if __name__ == "__main__":
     args = parse_arguments()
+    setup_logging()
     
-    bot = TradingBot(
-        strategy_name=args.strategy,
-        ticker=args.ticker,
-        interval=args.interval,
-        sandbox=args.sandbox if args.sandbox else None
-    )
-    
-    bot.run(continuous=args.continuous, interval_minutes=args.cycle_minutes)
+    if args.tickers:
+        from runner.supervisor import ShardSupervisor
+        supervisor = ShardSupervisor(
+            tickers=[ticker.strip() for ticker in args.tickers.split(',') if ticker.strip()],
+            workers=args.workers,
+            strategy_name=args.strategy,
+            interval=args.interval,
+            sandbox=args.sandbox if args.sandbox else None,
+            accounts=[account.strip() for account in args.accounts.split(',')] if args.accounts else None
+        )
+        supervisor.run()
+    else:
+        bot = TradingBot(
+            strategy_name=args.strategy,
+            ticker=args.ticker,
+            interval=args.interval,
+            sandbox=args.sandbox if args.sandbox else None,
+            order_book_depth=args.order_book,
+            accounts=[account.strip() for account in args.accounts.split(',')] if args.accounts else None
+        )
+        
+        bot.run(continuous=args.continuous, interval_minutes=args.cycle_minutes)
@@ -0,0 +1,157 @@
+"""
+Fixed-depth order book ring buffer with incremental microstructure features
+
+Snapshots are written into preallocated NumPy arrays, so an update costs a
+few scalar stores and no Python objects are retained per update. Spread,
+mid price, top-of-book imbalance and microprice are computed as each
+snapshot is written.
+"""
+import numpy as np
+
+import config
+
+
+def _to_float(value):
+    return value.units + value.nano / 1e9
+
+
+class OrderBookRing:
+    """
+    Ring buffer of the last `capacity` order book snapshots of one instrument
+
+    Args:
+        figi (str): Instrument FIGI
+        depth (int): Price levels kept per side
+        capacity (int): Snapshots kept before the oldest is overwritten
+        imbalance_levels (int): Levels per side summed for the imbalance feature
+    """
+
+    FEATURES = ("mid", "spread", "imbalance", "microprice")
+
+    def __init__(self, figi, depth=None, capacity=None, imbalance_levels=None):
+        self.figi = figi
+        self.depth = depth or config.ORDER_BOOK_DEPTH
+        self.capacity = capacity or config.ORDER_BOOK_CAPACITY
+        self.imbalance_levels = min(imbalance_levels or config.ORDER_BOOK_IMBALANCE_LEVELS, self.depth)
+
+        shape = (self.capacity, self.depth)
+        self.bid_price = np.full(shape, np.nan)
+        self.bid_qty = np.zeros(shape)
+        self.ask_price = np.full(shape, np.nan)
+        self.ask_qty = np.zeros(shape)
+        self.times = np.zeros(self.capacity, dtype=np.int64)
+        self.mid = np.full(self.capacity, np.nan)
+        self.spread = np.full(self.capacity, np.nan)
+        self.imbalance = np.full(self.capacity, np.nan)
+        self.microprice = np.full(self.capacity, np.nan)
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def update(self, time_ns, bids, asks):
+        """
+        Write one snapshot
+
+        Args:
+            time_ns (int): Snapshot time in nanoseconds since the epoch
+            bids: Iterable of API orders (price Quotation, quantity), best first
+            asks: Iterable of API orders (price Quotation, quantity), best first
+        """
+        row = self.count % self.capacity
+        levels = self.imbalance_levels
+        best_bid = best_ask = float("nan")
+        top_bid_qty = top_ask_qty = bid_volume = ask_volume = 0
+
+        # Features are accumulated in Python scalars while the row is written,
+        # which is cheaper than reading the row back through NumPy
+        bid_price, bid_qty = self.bid_price[row], self.bid_qty[row]
+        filled = 0
+        for order in bids:
+            if filled == self.depth:
+                break
+            price = _to_float(order.price)
+            quantity = order.quantity
+            bid_price[filled] = price
+            bid_qty[filled] = quantity
+            if filled == 0:
+                best_bid, top_bid_qty = price, quantity
+            if filled < levels:
+                bid_volume += quantity
+            filled += 1
+        if filled < self.depth:
+            bid_price[filled:] = np.nan
+            bid_qty[filled:] = 0
+
+        ask_price, ask_qty = self.ask_price[row], self.ask_qty[row]
+        filled = 0
+        for order in asks:
+            if filled == self.depth:
+                break
+            price = _to_float(order.price)
+            quantity = order.quantity
+            ask_price[filled] = price
+            ask_qty[filled] = quantity
+            if filled == 0:
+                best_ask, top_ask_qty = price, quantity
+            if filled < levels:
+                ask_volume += quantity
+            filled += 1
+        if filled < self.depth:
+            ask_price[filled:] = np.nan
+            ask_qty[filled:] = 0
+
+        self.times[row] = time_ns
+        self.mid[row] = (best_bid + best_ask) / 2
+        self.spread[row] = best_ask - best_bid
+        total = bid_volume + ask_volume
+        self.imbalance[row] = (bid_volume - ask_volume) / total if total else np.nan
+        top_total = top_bid_qty + top_ask_qty
+        self.microprice[row] = ((best_ask * top_bid_qty + best_bid * top_ask_qty) / top_total
+                                if top_total else np.nan)
+        self.count += 1
+
+    def update_from_message(self, orderbook):
+        """Write an OrderBook message from the market data stream"""
+        self.update(int(orderbook.time.timestamp() * 1e9), orderbook.bids, orderbook.asks)
+
+    def _indices(self, n=None):
+        """Row indices of the last n snapshots, oldest first"""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        return (np.arange(self.count - n, self.count) % self.capacity)
+
+    def latest(self):
+        """Features of the most recent snapshot as a dict, or None before the first update"""
+        if not self.count:
+            return None
+        row = (self.count - 1) % self.capacity
+        features = {name: float(getattr(self, name)[row]) for name in self.FEATURES}
+        features["best_bid"] = float(self.bid_price[row, 0])
+        features["best_ask"] = float(self.ask_price[row, 0])
+        features["time"] = int(self.times[row])
+        return features
+
+    def window(self, n=None):
+        """
+        Last n snapshots in chronological order
+
+        Returns:
+            dict: 'time' and feature arrays of shape (n,), plus level arrays
+            'bid_price', 'bid_qty', 'ask_price', 'ask_qty' of shape (n, depth)
+        """
+        index = self._indices(n)
+        result = {name: getattr(self, name)[index] for name in self.FEATURES}
+        result["time"] = self.times[index]
+        for name in ("bid_price", "bid_qty", "ask_price", "ask_qty"):
+            result[name] = getattr(self, name)[index]
+        return result
+
+    def features_frame(self, n=None):
+        """Feature history of the last n snapshots as a DataFrame indexed by UTC time"""
+        import pandas as pd
+
+        index = self._indices(n)
+        df = pd.DataFrame({name: getattr(self, name)[index] for name in self.FEATURES})
+        df.index = pd.to_datetime(self.times[index], unit="ns", utc=True)
+        return df
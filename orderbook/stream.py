@@ -0,0 +1,78 @@
+"""
+Order book stream capture into per-instrument ring buffers
+"""
+import logging
+import threading
+
+import config
+from orderbook.book import OrderBookRing
+
+logger = logging.getLogger(__name__)
+
+
+class OrderBookStream:
+    """
+    Subscribes to order book updates for a set of FIGIs on a background thread
+
+    Args:
+        token (str): API token
+        target (str): API endpoint
+        figis (list): Instruments to subscribe to
+        depth (int): Order book depth (1, 10, 20, 30, 40 or 50)
+        capacity (int): Snapshots kept per instrument
+    """
+
+    def __init__(self, token, target, figis, depth=None, capacity=None):
+        self.token = token
+        self.target = target
+        self.depth = depth or config.ORDER_BOOK_DEPTH
+        if self.depth not in config.ORDER_BOOK_DEPTHS:
+            raise ValueError(f"Order book depth must be one of {config.ORDER_BOOK_DEPTHS}, got {self.depth}")
+        self.books = {figi: OrderBookRing(figi, self.depth, capacity) for figi in figis}
+        self.updates = 0
+        self._stop = threading.Event()
+        self._stream = None
+        self._thread = None
+
+    def book(self, figi):
+        return self.books.get(figi)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="orderbook-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._stream is not None:
+            self._stream.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        from tinkoff.invest import Client, OrderBookInstrument
+
+        while not self._stop.is_set():
+            try:
+                with Client(self.token, target=self.target) as client:
+                    self._stream = client.create_market_data_stream()
+                    self._stream.order_book.subscribe([
+                        OrderBookInstrument(figi=figi, depth=self.depth) for figi in self.books
+                    ])
+                    logger.info(f"Subscribed to order books of {len(self.books)} instruments, depth {self.depth}")
+
+                    books = self.books
+                    for marketdata in self._stream:
+                        orderbook = marketdata.orderbook
+                        if orderbook is not None:
+                            book = books.get(orderbook.figi)
+                            if book is not None:
+                                book.update_from_message(orderbook)
+                                self.updates += 1
+                        if self._stop.is_set():
+                            break
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                logger.error(f"Order book stream error: {e}, reconnecting")
+                self._stop.wait(config.ORDER_BOOK_RECONNECT_DELAY)
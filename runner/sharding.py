@@ -0,0 +1,27 @@
+"""
+Stable partitioning of an instrument universe across worker processes
+"""
+import zlib
+
+
+def shard_for(figi, num_shards):
+    """
+    Return the shard index of a FIGI
+
+    Uses CRC32 rather than hash() so the assignment is identical in every
+    process and across restarts.
+    """
+    return zlib.crc32(figi.encode("utf-8")) % num_shards
+
+
+def partition(instruments, num_shards):
+    """
+    Split a {figi: ticker} mapping into per-shard mappings
+
+    Returns:
+        list: num_shards dicts of {figi: ticker}
+    """
+    shards = [{} for _ in range(num_shards)]
+    for figi, ticker in instruments.items():
+        shards[shard_for(figi, num_shards)][figi] = ticker
+    return shards
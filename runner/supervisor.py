@@ -0,0 +1,275 @@
+"""
+Supervisor for the sharded multi-process runner
+
+Partitions the instrument universe across worker processes by FIGI hash,
+restarts crashed workers, aggregates their health reports and routes every
+order intent through a single thread so each account has exactly one writer.
+"""
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+
+import pandas as pd
+from tinkoff.invest import Client
+
+import config
+from execution.order_pipeline import OrderPipeline
+from execution.risk import portfolio_holdings
+from main import TradingBot
+from runner.sharding import partition
+from runner.worker import run_worker
+from utils.snapshot import MarketSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class ShardSupervisor:
+    def __init__(self, tickers, workers=None, strategy_name=None, interval=None, sandbox=None, accounts=None):
+        self.tickers = tickers
+        self.num_workers = workers or multiprocessing.cpu_count()
+        # The router bot owns the accounts, the sizing rules and the API connection used for orders
+        self.router = TradingBot(strategy_name=strategy_name, interval=interval, sandbox=sandbox,
+                                 accounts=accounts)
+        self.strategy_name = self.router.strategy_name
+        self.interval = self.router.candle_interval
+        self.sandbox = self.router.sandbox_mode
+
+        # Spawn instead of fork: gRPC channels opened in the parent are not fork-safe
+        self.context = multiprocessing.get_context("spawn")
+        self.order_queue = self.context.Queue()
+        self.status_queue = self.context.Queue()
+        self.instruments = {}
+        self.shards = []
+        self.processes = {}
+        self.restarts = {}
+        self.health = {}
+        # Latest candle closes reported by each shard, {shard_id: DataFrame}
+        self.closes = {}
+        self._stop = threading.Event()
+        self._router_thread = None
+
+    def run(self):
+        """Resolve the universe, start workers and supervise them until interrupted"""
+        if not self.router.token:
+            logger.error("Tinkoff API token not found. Check your .env file.")
+            return
+
+        instruments = self._resolve_instruments()
+        if not instruments:
+            logger.error("No instruments to trade")
+            return
+
+        self.instruments = instruments
+        self.shards = [shard for shard in partition(instruments, self.num_workers) if shard]
+        logger.info(f"Running {len(instruments)} instruments on {len(self.shards)} worker processes")
+
+        self._router_thread = threading.Thread(target=self._run_router, name="order-router", daemon=True)
+        self._router_thread.start()
+        for shard_id in range(len(self.shards)):
+            self._start_worker(shard_id)
+
+        last_log = time.time()
+        try:
+            while not self._stop.is_set():
+                self._collect_health()
+                self._restart_crashed()
+                if time.time() - last_log >= config.SHARD_HEALTH_INTERVAL:
+                    self._log_health()
+                    last_log = time.time()
+        except KeyboardInterrupt:
+            logger.info("Stopping sharded runner")
+        finally:
+            self._stop.set()
+            for process in self.processes.values():
+                process.terminate()
+            for process in self.processes.values():
+                process.join()
+            # No more intents arrive: let the router finish its batch, then wait for open orders
+            self._router_thread.join(timeout=config.ORDER_DRAIN_TIMEOUT)
+            if self.router.order_pipeline is not None:
+                self.router.order_pipeline.stop(wait=True)
+
+    def _resolve_instruments(self):
+        """Resolve tickers to FIGIs once, before partitioning"""
+        instruments = {}
+        with Client(self.router.token, target=self.router.target) as client:
+            for ticker in self.tickers:
+                try:
+                    found = client.instruments.find_instrument(query=ticker)
+                    if not found.instruments:
+                        logger.warning(f"Instrument {ticker} not found, skipping")
+                        continue
+                    instruments[found.instruments[0].figi] = ticker
+                except Exception as e:
+                    logger.error(f"Error resolving {ticker}: {e}")
+        return instruments
+
+    def _start_worker(self, shard_id):
+        process = self.context.Process(
+            target=run_worker,
+            args=(shard_id, self.shards[shard_id], self.strategy_name, self.interval,
+                  self.sandbox, self.order_queue, self.status_queue),
+            name=f"shard-{shard_id}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[shard_id] = process
+
+    def _restart_crashed(self):
+        for shard_id, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            self.restarts[shard_id] = self.restarts.get(shard_id, 0) + 1
+            logger.warning(f"Shard {shard_id} exited with code {process.exitcode}, "
+                           f"restarting in {config.SHARD_RESTART_DELAY}s "
+                           f"(restart #{self.restarts[shard_id]})")
+            time.sleep(config.SHARD_RESTART_DELAY)
+            self._start_worker(shard_id)
+
+    def _collect_health(self):
+        try:
+            report = self.status_queue.get(timeout=1)
+        except queue.Empty:
+            return
+        if "closes" in report:
+            self._update_risk(report["shard"], report["closes"])
+            return
+        self.health[report["shard"]] = report
+
+    def _update_risk(self, shard_id, closes):
+        """
+        Re-estimate the router's volatility and correlation from the workers' candle windows
+
+        Runs on the supervising thread, so the order router never waits for it
+        beyond the risk engine's lock.
+        """
+        risk = self.router.risk
+        if risk is None:
+            return
+        self.closes[shard_id] = closes
+        frames = [frame for frame in self.closes.values() if not frame.empty]
+        if not frames:
+            return
+        started = time.perf_counter()
+        try:
+            combined = pd.concat(frames, axis=1).sort_index()
+            risk.update_history(combined)
+        except Exception as e:
+            logger.error(f"Error updating risk history from shard {shard_id}: {e}")
+            return
+        logger.info(f"Risk history updated for {combined.shape[1]} instruments "
+                    f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def summary(self):
+        """Aggregate the latest report of every shard"""
+        now = time.time()
+        shards = []
+        for shard_id in range(len(self.shards)):
+            report = dict(self.health.get(shard_id, {"shard": shard_id}))
+            report["restarts"] = self.restarts.get(shard_id, 0)
+            report["stale"] = now - report.get("time", 0) > 3 * config.SHARD_HEALTH_INTERVAL
+            shards.append(report)
+        return {
+            "shards": shards,
+            "evaluations": sum(report.get("evaluations", 0) for report in shards),
+            "latency_p99_ms": max((report.get("latency_p99_ms", 0.0) for report in shards), default=0.0),
+        }
+
+    def _log_health(self):
+        summary = self.summary()
+        logger.info(f"{summary['evaluations']} evaluations, worst p99 latency {summary['latency_p99_ms']:.1f} ms")
+        for report in summary["shards"]:
+            logger.info(f"Shard {report['shard']}: {report.get('instruments', '?')} instruments, "
+                        f"p50 {report.get('latency_p50_ms', 0.0):.1f} ms, "
+                        f"errors {report.get('errors', 0)}, restarts {report['restarts']}"
+                        f"{', STALE' if report['stale'] else ''}")
+
+    def _size_buys(self, batch):
+        """
+        Size every buy intent of a batch in one risk engine step per account
+
+        Returns:
+            dict: {figi: {account_id: shares}}; accounts missing from the snapshot
+            are left out and sized per order
+        """
+        bot = self.router
+        figis = list(dict.fromkeys(figi for figi, _, signal in batch if signal > 0))
+        if bot.risk is None or not figis:
+            return {}
+
+        sized = {}
+        for account_id in bot.account_ids:
+            if not all(bot.snapshot.has(figi, account_id) for figi in figis):
+                continue
+            try:
+                cash = bot.snapshot.cash(account_id)
+                positions, prices = portfolio_holdings(bot.snapshot.portfolios[account_id])
+                prices.update(bot.snapshot.prices)
+                position_size = config.ACCOUNT_POSITION_SIZE.get(account_id, config.POSITION_SIZE)
+                quantities, report = bot.risk.size_buys(figis, prices, cash, positions,
+                                                        max_notional=cash * position_size)
+            except Exception as e:
+                logger.error(f"Error sizing buys on {account_id}: {e}")
+                continue
+            bot.journal.record("risk", account_id=account_id, figis=figis,
+                               quantities=quantities.tolist(), **report)
+            for figi, quantity in zip(figis, quantities):
+                sized.setdefault(figi, {})[account_id] = int(quantity)
+        return sized
+
+    def _run_router(self):
+        """Order router thread; the runner stops when the router does, as nothing else drains the order queue"""
+        try:
+            self._route_orders()
+        except Exception as e:
+            logger.error(f"Order router failed: {e}")
+        finally:
+            if not self._stop.is_set():
+                logger.error("Order router stopped, stopping the sharded runner")
+                self._stop.set()
+
+    def _route_orders(self):
+        """
+        Single writer: size every order intent sequentially through one connection
+
+        Intents waiting in the queue are taken as one batch, and their buys are
+        sized together by the risk engine. Within an intent each account is
+        placed on its own thread, so every account still has a single writer.
+        Submission is handed to the order pipeline, which tracks open orders so a
+        second intent for the same instrument is not sized against cash or
+        shares already committed.
+        """
+        bot = self.router
+        # One batched price request and one portfolio request per account per tick for the whole universe
+        bot.snapshot = MarketSnapshot(bot.sandbox_mode)
+        # Fills adjust the snapshot's positions until its next refresh
+        bot.order_pipeline = OrderPipeline(bot.token, bot.target, bot.sandbox_mode,
+                                           journal=bot.journal, on_fill=bot.snapshot.apply_fill).start()
+        with Client(bot.token, target=bot.target) as client:
+            if not bot._initialize_trading(client, resolve_instrument=False):
+                logger.error("Order router could not initialize trading")
+                return
+            while not self._stop.is_set():
+                try:
+                    batch = [self.order_queue.get(timeout=1)]
+                except queue.Empty:
+                    continue
+                # Intents that arrived together are sized together
+                while True:
+                    try:
+                        batch.append(self.order_queue.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    bot.snapshot.refresh_if_stale(client, self.instruments, bot.account_ids)
+                except Exception as e:
+                    logger.error(f"Error refreshing market snapshot: {e}")
+                
+                quantities = self._size_buys(batch)
+                for figi, ticker, signal in batch:
+                    bot.figi = figi
+                    bot.ticker = ticker
+                    bot.cycle += 1
+                    bot._execute_signal(client, signal, quantities.get(figi) if signal > 0 else None)
@@ -0,0 +1,190 @@
+"""
+Shard worker: streams candles for its instruments and evaluates strategies
+
+Each worker runs in its own process with its own API connection, candle
+stream and per-instrument TradingBot strategy instances. Signals are sent to
+the supervisor's order router instead of being traded here, so order placement
+stays single-writer per account.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import config
+from utils.helpers import candle_to_row
+from utils.journal import Journal
+from utils.logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTION_INTERVALS = {
+    "1m": "SUBSCRIPTION_INTERVAL_ONE_MINUTE",
+    "5m": "SUBSCRIPTION_INTERVAL_FIVE_MINUTES",
+    "15m": "SUBSCRIPTION_INTERVAL_FIFTEEN_MINUTES",
+    "1h": "SUBSCRIPTION_INTERVAL_ONE_HOUR",
+}
+
+
+class ShardState:
+    """Candle windows, strategies and latency counters of one shard"""
+
+    def __init__(self, shard_id, bots, window=None):
+        self.shard_id = shard_id
+        self.bots = bots
+        self.windows = {figi: deque(maxlen=window or config.SHARD_WINDOW) for figi in bots}
+        self.latencies = deque(maxlen=1000)
+        # Counters are read by the heartbeat thread while the stream loop updates them
+        self._lock = threading.Lock()
+        self.evaluations = 0
+        self.signals = 0
+        self.errors = 0
+
+    def seed(self, figi, df):
+        """Fill a window from historical candles"""
+        self.windows[figi].extend(df.to_dict("records"))
+
+    def on_candle(self, candle):
+        """
+        Merge a stream candle into its window
+
+        Returns:
+            bool: True when the candle opened a new period, i.e. the previous one closed
+        """
+        window = self.windows.get(candle.figi)
+        if window is None:
+            return False
+        row = candle_to_row(candle)
+        if window and window[-1]["time"] == row["time"]:
+            window[-1] = row
+            return False
+        window.append(row)
+        return len(window) > 1
+
+    def evaluate(self, figi):
+        """Run the instrument's strategy on its closed candles, time it and journal the signal"""
+        bot = self.bots[figi]
+        started = time.perf_counter()
+        try:
+            data = pd.DataFrame(list(self.windows[figi])[:-1])
+            signal = bot.strategy.generate_signal(data)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Shard {self.shard_id}: error evaluating {figi}: {e}")
+            data, signal = None, 0
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies.append(elapsed)
+            self.evaluations += 1
+            if signal:
+                self.signals += 1
+        if data is None:
+            return signal
+
+        bot.journal.record("signal", ticker=bot.ticker, figi=figi, strategy=bot.strategy_name,
+                           signal=int(signal), close=float(data["close"].iloc[-1]), shard=self.shard_id)
+        bot.journal.record("cycle", ticker=bot.ticker, candles=len(data), signal_ms=elapsed * 1000,
+                           total_ms=elapsed * 1000, shard=self.shard_id)
+        return signal
+
+    def closes(self):
+        """Closes of the closed candles of every window, one column per FIGI, indexed by time"""
+        series = {}
+        for figi, window in self.windows.items():
+            rows = list(window)[:-1]
+            if rows:
+                series[figi] = pd.Series([row["close"] for row in rows], index=[row["time"] for row in rows])
+        return pd.DataFrame(series)
+
+    def health(self):
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            "shard": self.shard_id,
+            "pid": os.getpid(),
+            "instruments": len(self.bots),
+            "evaluations": self.evaluations,
+            "signals": self.signals,
+            "errors": self.errors,
+            "latency_p50_ms": float(np.percentile(latencies, 50)),
+            "latency_p99_ms": float(np.percentile(latencies, 99)),
+            "latency_max_ms": float(latencies.max()),
+            "time": time.time(),
+        }
+
+
+def _send_health(state, status_queue):
+    while True:
+        status_queue.put(state.health())
+        time.sleep(config.SHARD_HEALTH_INTERVAL)
+
+
+def run_worker(shard_id, instruments, strategy_name, interval, sandbox, order_queue, status_queue):
+    """
+    Worker process entry point
+
+    Args:
+        shard_id (int): Index of this shard
+        instruments (dict): {figi: ticker} assigned to the shard
+        strategy_name (str): Strategy for every instrument
+        interval (str): Candle interval ('1m', '5m', '15m', '1h')
+        sandbox (bool): Use the sandbox endpoint
+        order_queue: Queue receiving (figi, ticker, signal) order intents
+        status_queue: Queue receiving health reports and, every RISK_REFRESH_INTERVAL
+            seconds, the shard's candle closes for the router's risk engine
+    """
+    from tinkoff.invest import CandleInstrument, Client, SubscriptionInterval
+    from main import TradingBot
+
+    setup_logging()
+    # One journal file per shard, so processes never append to the same file
+    journal = Journal(name=f"shard-{shard_id}")
+
+    # Workers only evaluate strategies: orders are sized by the router's risk engine
+    bots = {}
+    for figi, ticker in instruments.items():
+        bot = TradingBot(strategy_name=strategy_name, ticker=ticker, interval=interval, sandbox=sandbox,
+                         journal=journal, risk=False)
+        bot.figi = figi
+        bots[figi] = bot
+
+    state = ShardState(shard_id, bots)
+    subscription_interval = getattr(SubscriptionInterval, SUBSCRIPTION_INTERVALS[interval])
+    any_bot = next(iter(bots.values()))
+    logger.info(f"Shard {shard_id} (pid {os.getpid()}) starting with {len(bots)} instruments")
+
+    # Heartbeats on a timer, so a shard whose instruments are quiet is not reported as stale
+    threading.Thread(target=_send_health, args=(state, status_queue), name="shard-health", daemon=True).start()
+
+    with Client(any_bot.token, target=any_bot.target) as client:
+        for figi, bot in bots.items():
+            df = bot._get_historical_data(client)
+            if df is not None and len(df):
+                state.seed(figi, df)
+            # The shard's window replaces the bot's own candle cache from here on
+            bot.candles = None
+
+        # The router's risk engine estimates volatility and correlation from the workers' windows
+        last_closes = time.time()
+        if config.RISK_ENABLED:
+            status_queue.put({"shard": shard_id, "closes": state.closes()})
+
+        stream = client.create_market_data_stream()
+        stream.candles.subscribe([
+            CandleInstrument(figi=figi, interval=subscription_interval) for figi in bots
+        ])
+
+        for marketdata in stream:
+            candle = marketdata.candle
+            if candle is not None and state.on_candle(candle):
+                signal = state.evaluate(candle.figi)
+                if signal:
+                    order_queue.put((candle.figi, bots[candle.figi].ticker, signal))
+
+            if config.RISK_ENABLED and time.time() - last_closes >= config.RISK_REFRESH_INTERVAL:
+                status_queue.put({"shard": shard_id, "closes": state.closes()})
+                last_closes = time.time()
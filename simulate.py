@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Paper trading simulator for Tinkoff Invest trading bot
+Records candles from the API into the local candle store and replays the
+trading bot through them on an in-process simulated exchange, and evaluates
+strategy parameters walk-forward over them
+"""
+import argparse
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
+import config
+from strategies.registry import strategy_names
+from utils.logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def record(args):
+    """Download candles for a ticker day by day and merge them into the store"""
+    from tinkoff.invest import Client, CandleInterval
+    from tinkoff.invest.utils import now
+    from tinkoff.invest.constants import INVEST_GRPC_API, INVEST_GRPC_API_SANDBOX
+    from utils.candle_store import CandleStore
+    from utils.helpers import convert_candles_to_dataframe
+
+    interval_map = {
+        "1m": CandleInterval.CANDLE_INTERVAL_1_MIN,
+        "5m": CandleInterval.CANDLE_INTERVAL_5_MIN,
+        "15m": CandleInterval.CANDLE_INTERVAL_15_MIN,
+        "1h": CandleInterval.CANDLE_INTERVAL_HOUR
+    }
+    store = CandleStore(args.store)
+    target = INVEST_GRPC_API_SANDBOX if args.sandbox else INVEST_GRPC_API
+
+    with Client(config.TINKOFF_TOKEN, target=target) as client:
+        instruments = client.instruments.find_instrument(query=args.ticker)
+        if not instruments.instruments:
+            print(f"Instrument {args.ticker} not found")
+            return
+        instrument = instruments.instruments[0]
+        store.save_instrument(args.ticker, instrument.figi, instrument.name)
+
+        to_time = now()
+        for day in range(args.days, 0, -1):
+            from_time = to_time - timedelta(days=day)
+            response = client.market_data.get_candles(
+                figi=instrument.figi,
+                from_=from_time,
+                to=from_time + timedelta(days=1),
+                interval=interval_map[args.interval]
+            )
+            df = convert_candles_to_dataframe(response.candles)
+            if len(df):
+                total = store.save(instrument.figi, args.interval, df)
+                print(f"{from_time:%Y-%m-%d}: {len(df)} candles ({total} stored)")
+
+
+def run(args):
+    """Replay the trading bot over stored candles"""
+    from main import TradingBot
+    from simulator.exchange import SimulatedExchange
+    from simulator.models import FixedSlippage, PercentCommission
+    from simulator.replay import run_replay
+    from utils.candle_store import CandleStore
+    from utils.journal import Journal
+
+    exchange = SimulatedExchange(
+        store=CandleStore(args.store),
+        interval=args.interval,
+        slippage=FixedSlippage(args.slippage_bps),
+        commission=PercentCommission(args.commission),
+        initial_cash=args.cash,
+    )
+    # Paper events go to their own journal, stamped with simulated time
+    journal = Journal(args.journal, clock=exchange.now)
+    bot = TradingBot(
+        strategy_name=args.strategy,
+        ticker=args.ticker,
+        interval=args.interval,
+        sandbox=True,
+        client_factory=exchange.client,
+        clock=exchange.now,
+        journal=journal,
+    )
+    summary = run_replay(bot, exchange, args.start, args.end, timedelta(minutes=args.cycle_minutes))
+    journal.close()
+    print(json.dumps(summary, indent=2, default=str))
+
+
+def walk_forward(args):
+    """Walk-forward parameter evaluation over stored candles"""
+    from simulator.walk_forward import run_walk_forward, summarize
+    from utils.candle_store import CandleStore
+
+    store = CandleStore(args.store)
+    instruments = store.instruments()
+    if args.tickers:
+        figis = []
+        for ticker in args.tickers.split(','):
+            ticker = ticker.strip()
+            if ticker in instruments:
+                figis.append(instruments[ticker]["figi"])
+            else:
+                print(f"Unknown ticker {ticker}, record it first")
+    else:
+        figis = store.figis(args.interval)
+    if not figis:
+        print(f"No {args.interval} candles stored")
+        return
+
+    results = run_walk_forward(
+        figis=figis,
+        strategy_names=args.strategy or list(config.WALK_FORWARD_GRIDS),
+        interval=args.interval,
+        store_root=args.store,
+        train_days=args.train_days,
+        test_days=args.test_days,
+        step_days=args.step_days,
+        objective=args.objective,
+        workers=args.workers,
+    )
+    if results.empty:
+        print("No folds evaluated")
+        return
+
+    tickers = {instrument["figi"]: ticker for ticker, instrument in instruments.items()}
+    results.insert(0, "ticker", results["figi"].map(tickers).fillna(results["figi"]))
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"Fold results written to {args.output}")
+    summary = summarize(results)
+    summary.insert(0, "ticker", summary["figi"].map(tickers).fillna(summary["figi"]))
+    print(summary.drop(columns=["figi"]).to_string(index=False))
+
+
+def parse_date(value):
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Tinkoff Invest Paper Trading Simulator')
+    parser.add_argument('--store', type=str, default=config.CANDLE_STORE_DIR,
+                        help='Directory of the local candle store')
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    record_parser = subparsers.add_parser('record', help='Download candles into the local store')
+    record_parser.add_argument('--ticker', type=str, default=config.TICKER, help='Ticker symbol to record')
+    record_parser.add_argument('--interval', type=str, choices=['1m', '5m', '15m', '1h'],
+                               default=config.CANDLE_INTERVAL, help='Candle interval')
+    record_parser.add_argument('--days', type=int, default=5, help='Number of days to download')
+    record_parser.add_argument('--sandbox', action='store_true', help='Use the sandbox endpoint')
+    record_parser.set_defaults(func=record)
+
+    run_parser = subparsers.add_parser('run', help='Replay the trading bot over stored candles')
+    run_parser.add_argument('--strategy', type=str, choices=strategy_names(),
+                            help='Trading strategy to use')
+    run_parser.add_argument('--ticker', type=str, default=config.TICKER, help='Ticker symbol to trade')
+    run_parser.add_argument('--interval', type=str, choices=['1m', '5m', '15m', '1h'],
+                            default=config.CANDLE_INTERVAL, help='Candle interval')
+    run_parser.add_argument('--start', type=parse_date, required=True, help='Start date (YYYY-MM-DD[THH:MM])')
+    run_parser.add_argument('--end', type=parse_date, required=True, help='End date (YYYY-MM-DD[THH:MM])')
+    run_parser.add_argument('--cycle-minutes', type=int, default=1,
+                            help='Simulated minutes between trading cycles')
+    run_parser.add_argument('--cash', type=float, default=config.SIM_INITIAL_CASH,
+                            help='Initial cash of the simulated account')
+    run_parser.add_argument('--slippage-bps', type=float, default=config.SIM_SLIPPAGE_BPS,
+                            help='Fixed slippage in basis points')
+    run_parser.add_argument('--commission', type=float, default=config.SIM_COMMISSION_RATE,
+                            help='Commission rate per fill')
+    run_parser.add_argument('--journal', type=str, default=config.SIM_JOURNAL_DIR,
+                            help='Directory of the replay event journal')
+    run_parser.set_defaults(func=run)
+
+    walk_parser = subparsers.add_parser('walk-forward', help='Walk-forward parameter evaluation over stored candles')
+    walk_parser.add_argument('--tickers', type=str, help='Comma-separated tickers (default: every stored instrument)')
+    walk_parser.add_argument('--strategy', type=str, action='append', choices=list(config.WALK_FORWARD_GRIDS),
+                             help='Strategy to evaluate, may be repeated (default: all)')
+    walk_parser.add_argument('--interval', type=str, choices=['1m', '5m', '15m', '1h'],
+                             default=config.CANDLE_INTERVAL, help='Candle interval')
+    walk_parser.add_argument('--train-days', type=int, default=config.WALK_FORWARD_TRAIN_DAYS,
+                             help='Calendar days in each train window')
+    walk_parser.add_argument('--test-days', type=int, default=config.WALK_FORWARD_TEST_DAYS,
+                             help='Calendar days in each test window')
+    walk_parser.add_argument('--step-days', type=int, help='Days between fold starts (default: test days)')
+    walk_parser.add_argument('--objective', type=str, choices=['sharpe', 'return'],
+                             default=config.WALK_FORWARD_OBJECTIVE, help='In-sample score to maximize')
+    walk_parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    walk_parser.add_argument('--output', type=str, help='CSV file for per-fold results')
+    walk_parser.set_defaults(func=walk_forward)
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    setup_logging()
+    args.func(args)
@@ -0,0 +1,445 @@
+"""
+In-process simulated exchange for paper trading against recorded candles
+
+SimulatedExchange mimics the subset of the Tinkoff Invest client used by
+TradingBot (accounts, instruments, candles, last prices, sandbox orders,
+portfolio and positions), so the bot can be replayed through stored market
+data without touching the network.
+"""
+import itertools
+import logging
+import threading
+from collections import namedtuple
+from datetime import timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+import config
+from simulator.models import BUY, SELL, FixedSlippage, PercentCommission
+from utils.candle_store import CandleStore
+
+logger = logging.getLogger(__name__)
+
+Quotation = namedtuple("Quotation", "units nano")
+MoneyValue = namedtuple("MoneyValue", "currency units nano")
+Candle = namedtuple("Candle", "time open high low close volume is_complete")
+
+INTERVAL_DURATIONS = {
+    "1m": timedelta(minutes=1),
+    "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15),
+    "1h": timedelta(hours=1),
+}
+
+CURRENCY_FIGI = "RUB000UTSTOM"
+MARKET_ORDER = 2
+
+
+class SimulatedOrderError(Exception):
+    """Raised when the simulated exchange rejects an order"""
+
+
+def to_quotation(value):
+    """Convert a float into a units/nano Quotation"""
+    units = int(value)
+    return Quotation(units, int(round((value - units) * 1e9)))
+
+
+def to_float(value):
+    """Convert a Quotation, MoneyValue, {'units', 'nano'} dict or number into a float"""
+    if isinstance(value, dict):
+        return float(value.get("units", 0)) + float(value.get("nano", 0)) / 1e9
+    if hasattr(value, "units"):
+        return float(value.units) + float(value.nano) / 1e9
+    return float(value)
+
+
+def _to_ns(when):
+    """Convert a datetime into UTC nanoseconds since the epoch"""
+    ts = pd.Timestamp(when)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return ts.value
+
+
+def _timedelta_ns(delta):
+    return int(delta.total_seconds() * 1e9)
+
+
+class _Series:
+    """Candles of a single instrument held as arrays for fast time lookups"""
+
+    def __init__(self, df):
+        self.times = df["time"].values.astype("datetime64[ns]").astype("int64")
+        self.open = df["open"].to_numpy(dtype=float)
+        self.close = df["close"].to_numpy(dtype=float)
+        self.volume = df["volume"].to_numpy(dtype=np.int64)
+        self.candles = [
+            Candle(t.to_pydatetime(), to_quotation(o), to_quotation(h), to_quotation(l),
+                   to_quotation(c), int(v), True)
+            for t, o, h, l, c, v in zip(df["time"], df["open"], df["high"], df["low"],
+                                        df["close"], df["volume"])
+        ]
+
+
+class _Account:
+    def __init__(self, account_id, name, cash):
+        self.id = account_id
+        self.name = name
+        self.cash = float(cash)
+        self.deposits = float(cash)
+        self.positions = {}
+        self.commission = 0.0
+
+
+class SimulatedExchange:
+    """
+    Matching simulator that fills market orders from stored candles
+
+    The exchange keeps its own clock. Candles are visible to the bot only once
+    they have closed, and market orders fill at the open of the first candle
+    starting at or after the clock, adjusted by the slippage model.
+    """
+
+    def __init__(self, store=None, interval=None, slippage=None, commission=None,
+                 initial_cash=None):
+        self.store = store or CandleStore()
+        self.interval = interval or config.CANDLE_INTERVAL
+        self.interval_duration = INTERVAL_DURATIONS[self.interval]
+        self.slippage = slippage or FixedSlippage(config.SIM_SLIPPAGE_BPS)
+        self.commission = commission or PercentCommission(config.SIM_COMMISSION_RATE)
+        self.initial_cash = config.SIM_INITIAL_CASH if initial_cash is None else initial_cash
+
+        self.clock = None
+        self.accounts = {}
+        self.fills = []
+        self._orders = {}
+        self._series = {}
+        self._ids = itertools.count(1)
+        # Orders may arrive concurrently from the order pipeline's submit threads
+        self._lock = threading.Lock()
+        self.open_account("Simulated account")
+
+    # Clock
+
+    def set_time(self, when):
+        """Move the simulation clock to an absolute time"""
+        self.clock = pd.Timestamp(_to_ns(when), tz="UTC")
+
+    def advance(self, delta):
+        """Move the simulation clock forward"""
+        self.clock = self.clock + delta
+
+    def now(self):
+        """Simulation time as a UTC datetime; usable as TradingBot's clock"""
+        return self.clock.to_pydatetime()
+
+    def client(self, token=None, target=None, **kwargs):
+        """Return a Client-compatible object; usable as TradingBot's client_factory"""
+        return SimulatedClient(self)
+
+    # Market data
+
+    def series(self, figi):
+        if figi not in self._series:
+            df = self.store.load(figi, self.interval)
+            if not len(df):
+                raise SimulatedOrderError(f"No recorded {self.interval} candles for {figi}")
+            self._series[figi] = _Series(df)
+        return self._series[figi]
+
+    def completed_candles(self, figi, start, end):
+        """Return candles opened in [start, end) that have closed by the clock"""
+        series = self.series(figi)
+        closed = self.clock.value - _timedelta_ns(self.interval_duration)
+        last = min(np.searchsorted(series.times, closed, side="right"),
+                   np.searchsorted(series.times, _to_ns(end), side="left"))
+        first = np.searchsorted(series.times, _to_ns(start), side="left")
+        return series.candles[first:last]
+
+    def last_price(self, figi):
+        """Close of the last completed candle, or None before the first one"""
+        series = self.series(figi)
+        last = np.searchsorted(series.times, self.clock.value - _timedelta_ns(self.interval_duration), side="right")
+        return float(series.close[last - 1]) if last else None
+
+    # Accounts
+
+    def open_account(self, name=None):
+        account_id = f"sim-account-{len(self.accounts) + 1}"
+        self.accounts[account_id] = _Account(account_id, name or account_id, self.initial_cash)
+        return account_id
+
+    def account(self, account_id):
+        if account_id not in self.accounts:
+            raise SimulatedOrderError(f"Unknown account {account_id}")
+        return self.accounts[account_id]
+
+    def pay_in(self, account_id, amount):
+        account = self.account(account_id)
+        value = to_float(amount)
+        account.cash += value
+        account.deposits += value
+        return account.cash
+
+    # Orders
+
+    def execute(self, account_id, figi, quantity, direction, order_type=MARKET_ORDER, order_id=None):
+        """
+        Fill a market order against the next candle
+
+        Args:
+            account_id (str): Simulated account
+            figi (str): Instrument FIGI
+            quantity (int): Number of shares
+            direction (int): 1 for buy, 2 for sell
+            order_type (int): Only market orders (2) are supported
+            order_id (str): Optional client order ID; repeated IDs return the original fill
+
+        Returns:
+            SimpleNamespace: Fill details shaped like a PostOrderResponse
+        """
+        with self._lock:
+            return self._execute(account_id, figi, quantity, direction, order_type, order_id)
+
+    def _execute(self, account_id, figi, quantity, direction, order_type, order_id):
+        if order_id is not None and order_id in self._orders:
+            return self._orders[order_id]
+
+        account = self.account(account_id)
+        direction = int(direction)
+        quantity = int(quantity)
+        if int(order_type) != MARKET_ORDER:
+            raise SimulatedOrderError("Only market orders are supported by the simulator")
+        if quantity <= 0:
+            raise SimulatedOrderError("Order quantity must be positive")
+
+        series = self.series(figi)
+        index = np.searchsorted(series.times, self.clock.value, side="left")
+        if index >= len(series.times):
+            raise SimulatedOrderError(f"No market data after {self.clock} to fill {figi}")
+
+        price = float(self.slippage.fill_price(series.open[index], direction, quantity, series.volume[index]))
+        fee = self.commission.fee(price, quantity)
+        held = account.positions.get(figi, 0)
+
+        if direction == BUY:
+            cost = price * quantity + fee
+            if cost > account.cash:
+                raise SimulatedOrderError(f"Insufficient funds: need {cost:.2f}, have {account.cash:.2f}")
+            account.cash -= cost
+            account.positions[figi] = held + quantity
+        elif direction == SELL:
+            if quantity > held:
+                raise SimulatedOrderError(f"Cannot sell {quantity} of {figi}, holding {held}")
+            account.cash += price * quantity - fee
+            account.positions[figi] = held - quantity
+            if not account.positions[figi]:
+                del account.positions[figi]
+        else:
+            raise SimulatedOrderError(f"Unknown order direction {direction}")
+
+        account.commission += fee
+        order_id = order_id or f"sim-{next(self._ids)}"
+        fill = SimpleNamespace(
+            order_id=order_id,
+            figi=figi,
+            direction=direction,
+            execution_report_status="EXECUTION_REPORT_STATUS_FILL",
+            lots_requested=quantity,
+            lots_executed=quantity,
+            executed_order_price=MoneyValue("rub", *to_quotation(price)),
+            total_order_amount=MoneyValue("rub", *to_quotation(price * quantity)),
+            executed_commission=MoneyValue("rub", *to_quotation(fee)),
+            time=series.candles[index].time,
+        )
+        self._orders[order_id] = fill
+        self.fills.append(fill)
+        return fill
+
+    def order_state(self, order_id):
+        """Return the fill of a previously executed order"""
+        if order_id not in self._orders:
+            raise SimulatedOrderError(f"Unknown order {order_id}")
+        return self._orders[order_id]
+
+    # Reporting
+
+    def equity(self, account_id):
+        """Cash plus positions marked at the last completed candle"""
+        account = self.account(account_id)
+        value = account.cash
+        for figi, quantity in account.positions.items():
+            value += quantity * (self.last_price(figi) or 0.0)
+        return value
+
+    def summary(self):
+        """Per-account cash, positions, equity and P&L net of deposits"""
+        result = {}
+        for account_id, account in self.accounts.items():
+            equity = self.equity(account_id)
+            result[account_id] = {
+                "cash": account.cash,
+                "positions": dict(account.positions),
+                "equity": equity,
+                "deposits": account.deposits,
+                "pnl": equity - account.deposits,
+                "commission": account.commission,
+            }
+        return {"fills": len(self.fills), "accounts": result}
+
+
+class _UsersService:
+    def __init__(self, exchange):
+        self._exchange = exchange
+
+    def get_accounts(self):
+        accounts = [
+            SimpleNamespace(
+                id=account.id,
+                name=account.name,
+                type=SimpleNamespace(name="ACCOUNT_TYPE_TINKOFF"),
+                status=SimpleNamespace(name="ACCOUNT_STATUS_OPEN"),
+                opened_date=None,
+            )
+            for account in self._exchange.accounts.values()
+        ]
+        return SimpleNamespace(accounts=accounts)
+
+
+class _InstrumentsService:
+    def __init__(self, exchange):
+        self._exchange = exchange
+
+    def find_instrument(self, query):
+        store = self._exchange.store
+        found = []
+        for ticker, info in store.instruments().items():
+            if query in (ticker, info["figi"]):
+                found.append(SimpleNamespace(ticker=ticker, figi=info["figi"], name=info["name"]))
+        if not found and query in store.figis(self._exchange.interval):
+            found.append(SimpleNamespace(ticker=query, figi=query, name=query))
+        return SimpleNamespace(instruments=found)
+
+
+class _MarketDataService:
+    def __init__(self, exchange):
+        self._exchange = exchange
+
+    def get_candles(self, figi, from_, to, interval=None):
+        """Serve the configured interval for the requested time range, up to the clock"""
+        candles = self._exchange.completed_candles(figi, from_, to)
+        return SimpleNamespace(candles=candles)
+
+    def get_last_prices(self, figi):
+        last_prices = []
+        for item in figi:
+            price = self._exchange.last_price(item)
+            if price is not None:
+                last_prices.append(SimpleNamespace(figi=item, price=to_quotation(price),
+                                                   time=self._exchange.clock.to_pydatetime()))
+        return SimpleNamespace(last_prices=last_prices)
+
+
+class _PortfolioService:
+    """Portfolio, positions and order calls shared by the sandbox and production facades"""
+
+    def __init__(self, exchange):
+        self._exchange = exchange
+
+    def _portfolio(self, account_id):
+        account = self._exchange.account(account_id)
+        positions = [SimpleNamespace(
+            figi=CURRENCY_FIGI,
+            instrument_type="currency",
+            quantity=to_quotation(account.cash),
+            current_price=MoneyValue("rub", 1, 0),
+        )]
+        for figi, quantity in account.positions.items():
+            price = self._exchange.last_price(figi) or 0.0
+            positions.append(SimpleNamespace(
+                figi=figi,
+                instrument_type="share",
+                quantity=to_quotation(quantity),
+                current_price=MoneyValue("rub", *to_quotation(price)),
+            ))
+        total = self._exchange.equity(account_id)
+        return SimpleNamespace(
+            account_id=account_id,
+            positions=positions,
+            total_amount_portfolio=MoneyValue("rub", *to_quotation(total)),
+        )
+
+    def _positions(self, account_id):
+        account = self._exchange.account(account_id)
+        securities = [
+            SimpleNamespace(figi=figi, balance=quantity, blocked=0, instrument_type="share")
+            for figi, quantity in account.positions.items()
+        ]
+        return SimpleNamespace(
+            money=[MoneyValue("rub", *to_quotation(account.cash))],
+            blocked=[],
+            securities=securities,
+        )
+
+    def _post_order(self, figi, quantity, direction, account_id, order_type=MARKET_ORDER,
+                    price=None, order_id=None, **kwargs):
+        return self._exchange.execute(account_id, figi, quantity, direction,
+                                      order_type=order_type, order_id=order_id)
+
+
+class _SandboxService(_PortfolioService):
+    def open_sandbox_account(self, name=None):
+        return SimpleNamespace(account_id=self._exchange.open_account(name))
+
+    def sandbox_pay_in(self, account_id, amount):
+        balance = self._exchange.pay_in(account_id, amount)
+        return SimpleNamespace(balance=MoneyValue("rub", *to_quotation(balance)))
+
+    def get_sandbox_portfolio(self, account_id):
+        return self._portfolio(account_id)
+
+    def get_sandbox_positions(self, account_id):
+        return self._positions(account_id)
+
+    def post_sandbox_order(self, **kwargs):
+        return self._post_order(**kwargs)
+
+    def get_sandbox_order_state(self, account_id, order_id):
+        return self._exchange.order_state(order_id)
+
+
+class _OperationsService(_PortfolioService):
+    def get_portfolio(self, account_id):
+        return self._portfolio(account_id)
+
+    def get_positions(self, account_id):
+        return self._positions(account_id)
+
+
+class _OrdersService(_PortfolioService):
+    def post_order(self, **kwargs):
+        return self._post_order(**kwargs)
+
+    def get_order_state(self, account_id, order_id):
+        return self._exchange.order_state(order_id)
+
+
+class SimulatedClient:
+    """Context manager exposing the same service attributes as tinkoff.invest.Client"""
+
+    def __init__(self, exchange):
+        self.users = _UsersService(exchange)
+        self.instruments = _InstrumentsService(exchange)
+        self.market_data = _MarketDataService(exchange)
+        self.sandbox = _SandboxService(exchange)
+        self.operations = _OperationsService(exchange)
+        self.orders = _OrdersService(exchange)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
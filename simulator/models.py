@@ -0,0 +1,57 @@
+"""
+Fill price and commission models for the simulated exchange
+"""
+
+BUY = 1
+SELL = 2
+
+
+class FixedSlippage:
+    """Moves every fill a fixed number of basis points against the order"""
+
+    def __init__(self, bps=5):
+        self.bps = bps
+
+    def fill_price(self, price, direction, quantity, volume):
+        """
+        Adjust a reference price for slippage
+
+        Args:
+            price (float): Reference price of the fill candle
+            direction (int): 1 for buy, 2 for sell
+            quantity (int): Order quantity
+            volume (int): Volume of the fill candle
+
+        Returns:
+            float: Price the order is filled at
+        """
+        shift = price * self.bps / 10000
+        return price + shift if direction == BUY else price - shift
+
+
+class VolumeSlippage(FixedSlippage):
+    """
+    Fixed slippage plus a market impact term proportional to the share of
+    candle volume the order consumes.
+    """
+
+    def __init__(self, bps=2, impact_bps=100):
+        super().__init__(bps)
+        self.impact_bps = impact_bps
+
+    def fill_price(self, price, direction, quantity, volume):
+        participation = min(quantity / volume, 1.0) if volume else 1.0
+        shift = price * (self.bps + self.impact_bps * participation) / 10000
+        return price + shift if direction == BUY else price - shift
+
+
+class PercentCommission:
+    """Commission as a fraction of traded value with an optional minimum fee"""
+
+    def __init__(self, rate=0.0005, minimum=0.0):
+        self.rate = rate
+        self.minimum = minimum
+
+    def fee(self, price, quantity):
+        """Return the commission charged for a fill"""
+        return max(price * quantity * self.rate, self.minimum)
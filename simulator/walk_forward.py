@@ -0,0 +1,266 @@
+"""
+Walk-forward evaluation of strategy parameters over stored candles
+
+History is split into rolling folds of `train_days` followed by `test_days`.
+On each fold the parameter set with the best in-sample score on the train
+window is chosen and scored out of sample on the test window.
+
+Evaluation is vectorized: a parameter set is run once over the whole history
+as a long/flat position (long after a buy signal until the next sell), and
+every fold is then scored in constant time from prefix sums of its net
+returns. Indicators depend only on a strategy's FEATURE_PARAMS, so they are
+computed once per instrument and shared by every parameter set and fold.
+Instruments and strategies are evaluated in parallel processes.
+"""
+import itertools
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import config
+from strategies.registry import create_strategy, default_params
+from utils.candle_store import CandleStore
+
+logger = logging.getLogger(__name__)
+
+OBJECTIVES = ("sharpe", "return")
+
+
+def param_grid(grid):
+    """Expand {name: [values]} into a list of parameter dicts"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def make_folds(times, train_days, test_days, step_days=None):
+    """
+    Rolling train/test folds over candle times
+
+    Args:
+        times: Sorted candle times
+        train_days (int): Calendar days in each train window
+        test_days (int): Calendar days in each test window
+        step_days (int): Days between fold starts, defaults to test_days
+
+    Returns:
+        list: (train_start, test_start, test_end) row indices; the train window is
+        [train_start, test_start) and the test window [test_start, test_end).
+        Only folds whose test window is fully covered by the history are returned.
+    """
+    times = pd.DatetimeIndex(times)
+    if not len(times):
+        return []
+    step = pd.Timedelta(days=step_days or test_days)
+    train, test = pd.Timedelta(days=train_days), pd.Timedelta(days=test_days)
+    last = times[-1]
+
+    folds = []
+    start = times[0].normalize()
+    while start + train + test <= last:
+        bounds = times.searchsorted([start, start + train, start + train + test])
+        train_start, test_start, test_end = (int(bound) for bound in bounds)
+        if test_start > train_start and test_end > test_start:
+            folds.append((train_start, test_start, test_end))
+        start += step
+    return folds
+
+
+def _positions(signal):
+    """Long (1) from a buy signal until the next sell signal, flat (0) otherwise"""
+    index = np.where(signal != 0, np.arange(len(signal)), -1)
+    np.maximum.accumulate(index, out=index)
+    return np.where(index >= 0, signal[index] > 0, False).astype(np.float64)
+
+
+class InstrumentEvaluator:
+    """
+    Scores parameter sets of one strategy on one instrument's candles
+
+    Args:
+        strategy_name (str): Registered strategy name
+        candles (pd.DataFrame): Candles sorted by time
+        cost (float): Commission plus slippage per unit of turnover
+    """
+
+    def __init__(self, strategy_name, candles, cost):
+        self.strategy_name = strategy_name
+        self.candles = candles
+        self.cost = cost
+        close = candles["close"].to_numpy(dtype=np.float64)
+        self.returns = np.zeros(len(close))
+        self.returns[1:] = close[1:] / close[:-1] - 1
+        self._features = {}
+
+        days = candles["time"].dt.normalize().nunique()
+        self.annualization = np.sqrt(252 * len(candles) / max(days, 1))
+
+    def _features_for(self, strategy, params):
+        if strategy.FEATURE_PARAMS is None:
+            key = tuple(sorted(params.items()))
+        else:
+            key = tuple(getattr(strategy, name) for name in strategy.FEATURE_PARAMS)
+        features = self._features.get(key)
+        if features is None:
+            features = self._features[key] = strategy.compute_features(self.candles)
+        return features
+
+    def net_returns(self, params):
+        """
+        Per-candle net log returns of a parameter set
+
+        A signal on a candle's close is traded on the next candle, so the
+        position decided at candle t earns the return of candle t + 1.
+        """
+        strategy = create_strategy(self.strategy_name, dict(default_params(), **params))
+        signal = np.asarray(strategy.signals_from_features(self._features_for(strategy, params)))
+        position = _positions(signal)
+        held = np.zeros(len(position))
+        held[1:] = position[:-1]
+        turnover = np.abs(np.diff(held, prepend=0.0))
+        return np.log1p(held * self.returns - turnover * self.cost), turnover
+
+    def score(self, params, windows):
+        """
+        Metrics of a parameter set on many windows at once
+
+        Args:
+            params (dict): Strategy parameters
+            windows (np.ndarray): (n, 2) array of [start, end) row indices
+
+        Returns:
+            dict: 'return', 'sharpe' and 'trades' arrays of length n
+        """
+        net, turnover = self.net_returns(params)
+        sums = np.concatenate(([0.0], np.cumsum(net)))
+        squares = np.concatenate(([0.0], np.cumsum(net * net)))
+        trades = np.concatenate(([0.0], np.cumsum(turnover)))
+
+        start, end = windows[:, 0], windows[:, 1]
+        count = np.maximum(end - start, 1)
+        total = sums[end] - sums[start]
+        mean = total / count
+        variance = np.maximum((squares[end] - squares[start]) / count - mean * mean, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = np.where(variance > 0, mean / np.sqrt(variance) * self.annualization, 0.0)
+        return {
+            "return": np.expm1(total),
+            "sharpe": sharpe,
+            "trades": trades[end] - trades[start],
+        }
+
+
+def evaluate_instrument(store_root, figi, interval, strategy_name, grid, train_days, test_days,
+                        step_days=None, objective="sharpe", cost=None):
+    """
+    Walk-forward one strategy on one instrument
+
+    Returns:
+        list: One result dict per fold
+    """
+    started = time.perf_counter()
+    candles = CandleStore(store_root).load(figi, interval)
+    folds = make_folds(candles["time"], train_days, test_days, step_days)
+    if not folds:
+        logger.warning(f"{figi}: not enough {interval} history for a {train_days}+{test_days} day fold")
+        return []
+
+    cost = config.SIM_COMMISSION_RATE + config.SIM_SLIPPAGE_BPS / 1e4 if cost is None else cost
+    evaluator = InstrumentEvaluator(strategy_name, candles, cost)
+    folds = np.array(folds)
+    train_windows, test_windows = folds[:, [0, 1]], folds[:, [1, 2]]
+
+    candidates = param_grid(grid)
+    train_scores = np.empty((len(candidates), len(folds)))
+    test_metrics = []
+    for row, params in enumerate(candidates):
+        train_scores[row] = evaluator.score(params, train_windows)[objective]
+        test_metrics.append(evaluator.score(params, test_windows))
+
+    best = np.argmax(train_scores, axis=0)
+    times = candles["time"]
+    results = []
+    for fold, (train_start, test_start, test_end) in enumerate(folds):
+        chosen = best[fold]
+        test = test_metrics[chosen]
+        results.append({
+            "figi": figi,
+            "strategy": strategy_name,
+            "fold": fold,
+            "train_start": times.iloc[train_start],
+            "test_start": times.iloc[test_start],
+            "test_end": times.iloc[test_end - 1],
+            "params": candidates[chosen],
+            "train_score": float(train_scores[chosen, fold]),
+            "test_return": float(test["return"][fold]),
+            "test_sharpe": float(test["sharpe"][fold]),
+            "test_trades": int(test["trades"][fold]),
+        })
+    logger.info(f"{figi} {strategy_name}: {len(folds)} folds x {len(candidates)} parameter sets "
+                f"in {time.perf_counter() - started:.2f}s")
+    return results
+
+
+def run_walk_forward(figis, strategy_names, interval, store_root=None, train_days=None, test_days=None,
+                     step_days=None, objective=None, grids=None, workers=None):
+    """
+    Walk-forward every strategy on every instrument in parallel processes
+
+    Args:
+        figis (list): Instruments with stored candles
+        strategy_names (list): Registered strategy names
+        interval (str): Candle interval
+        store_root (str): Candle store directory
+        train_days (int): Calendar days in each train window
+        test_days (int): Calendar days in each test window
+        step_days (int): Days between fold starts, defaults to test_days
+        objective (str): In-sample score to maximize, 'sharpe' or 'return'
+        grids (dict): {strategy name: {param: [values]}}, defaults to config.WALK_FORWARD_GRIDS
+        workers (int): Worker processes, defaults to the CPU count
+
+    Returns:
+        pd.DataFrame: One row per instrument, strategy and fold
+    """
+    store_root = store_root or config.CANDLE_STORE_DIR
+    train_days = train_days or config.WALK_FORWARD_TRAIN_DAYS
+    test_days = test_days or config.WALK_FORWARD_TEST_DAYS
+    objective = objective or config.WALK_FORWARD_OBJECTIVE
+    grids = grids or config.WALK_FORWARD_GRIDS
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective {objective}, expected one of {', '.join(OBJECTIVES)}")
+
+    tasks = [(store_root, figi, interval, name, grids[name], train_days, test_days, step_days, objective)
+             for figi in figis for name in strategy_names]
+    workers = min(workers or multiprocessing.cpu_count(), max(len(tasks), 1))
+
+    started = time.perf_counter()
+    results = []
+    if workers <= 1:
+        for task in tasks:
+            results.extend(evaluate_instrument(*task))
+    else:
+        # Spawn, as in the sharded runner, so workers never inherit open connections
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            for fold_results in executor.map(evaluate_instrument, *zip(*tasks)):
+                results.extend(fold_results)
+    logger.info(f"Walk-forward of {len(tasks)} instrument/strategy pairs "
+                f"in {time.perf_counter() - started:.1f}s with {workers} workers")
+    return pd.DataFrame(results)
+
+
+def summarize(results):
+    """Out-of-sample totals per instrument and strategy"""
+    if results.empty:
+        return results
+    grouped = results.groupby(["figi", "strategy"])
+    return pd.DataFrame({
+        "folds": grouped.size(),
+        "oos_return": grouped["test_return"].apply(lambda returns: float(np.prod(1 + returns) - 1)),
+        "mean_test_sharpe": grouped["test_sharpe"].mean(),
+        "positive_folds": grouped["test_return"].apply(lambda returns: float((returns > 0).mean())),
+        "trades": grouped["test_trades"].sum(),
+    }).reset_index()
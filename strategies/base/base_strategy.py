@@ -5,8 +5,25 @@ Base strategy module for Tinkoff Invest trading bot
 class BaseStrategy:
     """Base class for all trading strategies"""
     
+    # Names of the parameters compute_features depends on. Parameter sets that agree
+    # on these share cached features during walk-forward evaluation; None means
+    # every parameter matters.
+    FEATURE_PARAMS = None
+    
     def __init__(self, params=None):
         self.params = params or {}
+        # OrderBookRing of the traded instrument, attached by the bot when order books are streamed
+        self.order_book = None
+    
+    def order_book_features(self):
+        """
+        Latest order book features for use in generate_signal
+        
+        Returns:
+            dict: mid, spread, imbalance, microprice, best_bid, best_ask and time,
+            or None when no order book is attached or no update has arrived yet
+        """
+        return self.order_book.latest() if self.order_book is not None else None
     
     def generate_signal(self, data):
         """
@@ -17,3 +34,65 @@ class BaseStrategy:
             0 for no action
         """
         raise NotImplementedError("Subclasses must implement this method")
+    
+    def warmup_period(self):
+        """
+        Candles needed before a row for its indicators to be complete
+        
+        Callers computing signals on a slice of history (e.g. chart overlays)
+        prepend this many candles, so the slice matches the full-history result.
+        """
+        return 0
+    
+    def get_state(self):
+        """
+        State to carry across restarts in the bot's checkpoint
+        
+        Indicators recomputed from the candle window need nothing here; strategies
+        that keep incremental state between calls override this and set_state.
+        
+        Returns:
+            dict: Picklable strategy state
+        """
+        return {}
+    
+    def set_state(self, state):
+        """Restore state returned by get_state"""
+    
+    def generate_signals(self, data):
+        """
+        Generate the signal for every row of data
+        
+        The default implementation calls generate_signal on each prefix of the
+        data; subclasses override it with a vectorized version that also
+        returns their indicator columns.
+        
+        Returns:
+            pd.DataFrame: Copy of data with a 'signal' column
+        """
+        result = data.copy()
+        result['signal'] = [
+            self.generate_signal(data.iloc[:end + 1].copy()) for end in range(len(data))
+        ]
+        return result
+    
+    def compute_features(self, data):
+        """
+        Indicators that signals_from_features turns into signals
+        
+        The default computes the full generate_signals result; strategies split
+        threshold-independent indicators out so they can be cached and reused.
+        
+        Returns:
+            pd.DataFrame: Feature columns aligned with data
+        """
+        return self.generate_signals(data)
+    
+    def signals_from_features(self, features):
+        """
+        Signals from features returned by compute_features
+        
+        Returns:
+            np.ndarray: Signal for every row
+        """
+        return features['signal'].to_numpy()
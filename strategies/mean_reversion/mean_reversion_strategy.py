@@ -11,11 +11,17 @@ class MeanReversionStrategy(BaseStrategy):
     price deviations from a moving average.
     """
     
+    # Parameters the indicators depend on; the threshold only affects the signal
+    FEATURE_PARAMS = ('window',)
+    
     def __init__(self, params=None):
         super().__init__(params)
         self.window = self.params.get('window', 20)
         self.std_dev_threshold = self.params.get('std_dev_threshold', 1.5)
     
+    def warmup_period(self):
+        return self.window
+    
     def generate_signal(self, data):
         """
         Generate trading signal based on mean reversion
@@ -49,3 +55,44 @@ class MeanReversionStrategy(BaseStrategy):
         else:
             # Price is within normal range, no signal
             return 0
+    
+    def compute_features(self, data):
+        """
+        Threshold-independent indicators, shared by every parameter set with the same window
+        
+        Returns:
+            pd.DataFrame: 'ma', 'std' and 'z_score' columns aligned with data
+        """
+        features = pd.DataFrame(index=data.index)
+        features['ma'] = data['close'].rolling(window=self.window).mean()
+        features['std'] = data['close'].rolling(window=self.window).std()
+        features['z_score'] = (data['close'] - features['ma']) / features['std']
+        return features
+    
+    def signals_from_features(self, features):
+        """
+        Apply the threshold to features from compute_features
+        
+        Returns:
+            np.ndarray: Signal for every row
+        """
+        z_score = features['z_score'].to_numpy()
+        return np.where(z_score < -self.std_dev_threshold, 1,
+                        np.where(z_score > self.std_dev_threshold, -1, 0))
+    
+    def generate_signals(self, data):
+        """
+        Vectorized mean reversion signal for every row
+        
+        Returns:
+            pd.DataFrame: Copy of data with 'ma', 'std', 'z_score', 'upper_band',
+            'lower_band' and 'signal' columns
+        """
+        result = data.copy()
+        features = self.compute_features(data)
+        for column in ('ma', 'std', 'z_score'):
+            result[column] = features[column]
+        result['upper_band'] = result['ma'] + result['std'] * self.std_dev_threshold
+        result['lower_band'] = result['ma'] - result['std'] * self.std_dev_threshold
+        result['signal'] = self.signals_from_features(features)
+        return result
@@ -11,12 +11,18 @@ class MomentumStrategy(BaseStrategy):
     recent price momentum.
     """
     
+    # Parameters the indicators depend on; the thresholds only affect the signal
+    FEATURE_PARAMS = ('lookback_period',)
+    
     def __init__(self, params=None):
         super().__init__(params)
         self.lookback_period = self.params.get('lookback_period', 14)
         self.buy_threshold = self.params.get('buy_threshold', 0.005)
         self.sell_threshold = self.params.get('sell_threshold', 0.005)
     
+    def warmup_period(self):
+        return self.lookback_period
+    
     def generate_signal(self, data):
         """
         Generate trading signal based on momentum
@@ -43,3 +49,42 @@ class MomentumStrategy(BaseStrategy):
             return -1
         else:
             return 0
+    
+    def compute_features(self, data):
+        """
+        Threshold-independent indicators, shared by every parameter set with the same lookback
+        
+        Returns:
+            pd.DataFrame: 'returns' and 'momentum' columns aligned with data
+        """
+        features = pd.DataFrame(index=data.index)
+        features['returns'] = data['close'].pct_change()
+        features['momentum'] = features['returns'].rolling(window=self.lookback_period, min_periods=1).sum()
+        return features
+    
+    def signals_from_features(self, features):
+        """
+        Apply the thresholds to features from compute_features
+        
+        Returns:
+            np.ndarray: Signal for every row
+        """
+        momentum = features['momentum'].to_numpy()
+        signal = np.where(momentum > self.buy_threshold, 1,
+                          np.where(momentum < -self.sell_threshold, -1, 0))
+        signal[:self.lookback_period - 1] = 0
+        return signal
+    
+    def generate_signals(self, data):
+        """
+        Vectorized momentum signal for every row
+        
+        Returns:
+            pd.DataFrame: Copy of data with 'returns', 'momentum' and 'signal' columns
+        """
+        result = data.copy()
+        features = self.compute_features(data)
+        result['returns'] = features['returns']
+        result['momentum'] = features['momentum']
+        result['signal'] = self.signals_from_features(features)
+        return result
@@ -0,0 +1,43 @@
+"""
+Lazily loaded registry of trading strategies
+
+Strategy modules are imported only when a strategy is created, so listing
+strategy names (e.g. for command line choices) does not import pandas.
+"""
+import importlib
+
+import config
+
+STRATEGIES = {
+    "simple_momentum": ("strategies.momentum.momentum_strategy", "MomentumStrategy"),
+    "mean_reversion": ("strategies.mean_reversion.mean_reversion_strategy", "MeanReversionStrategy"),
+}
+
+DEFAULT_STRATEGY = "simple_momentum"
+
+
+def default_params():
+    """Strategy parameters from config, shared by every strategy"""
+    return {
+        'lookback_period': config.LOOKBACK_PERIOD,
+        'buy_threshold': config.BUY_THRESHOLD,
+        'sell_threshold': config.SELL_THRESHOLD,
+        'window': 20,  # For mean reversion
+        'std_dev_threshold': 1.5  # For mean reversion
+    }
+
+
+def strategy_names():
+    """Return the names of all registered strategies"""
+    return list(STRATEGIES)
+
+
+def get_strategy_class(name):
+    """Import and return the strategy class registered under a name"""
+    module_name, class_name = STRATEGIES[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def create_strategy(name, params=None):
+    """Instantiate a registered strategy with the given parameters"""
+    return get_strategy_class(name)(params)
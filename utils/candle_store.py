@@ -0,0 +1,115 @@
+"""
+Local candle storage for Tinkoff Invest trading bot
+"""
+import json
+import os
+
+import pandas as pd
+
+import config
+
+CANDLE_COLUMNS = ["time", "open", "high", "low", "close", "volume"]
+
+
+def utc_timestamp(value):
+    """Convert a datetime or ISO string into a UTC Timestamp, treating naive values as UTC"""
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+class CandleStore:
+    """
+    File-based store of OHLCV candles, one pickled DataFrame per FIGI and interval.
+
+    Layout:
+        <root>/<interval>/<figi>.pkl   candles sorted by time
+        <root>/instruments.json        ticker -> {"figi", "name"} lookup
+    """
+
+    def __init__(self, root=None):
+        self.root = root or config.CANDLE_STORE_DIR
+
+    def path(self, figi, interval):
+        """Return the file path holding candles for a FIGI and interval"""
+        return os.path.join(self.root, interval, f"{figi}.pkl")
+
+    def load(self, figi, interval, start=None, end=None):
+        """
+        Load stored candles
+
+        Args:
+            figi (str): Instrument FIGI
+            interval (str): Candle interval ('1m', '5m', '15m', '1h')
+            start (datetime): Optional inclusive lower bound on candle time
+            end (datetime): Optional exclusive upper bound on candle time
+
+        Returns:
+            pd.DataFrame: Candles with the same columns as convert_candles_to_dataframe
+        """
+        path = self.path(figi, interval)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=CANDLE_COLUMNS)
+
+        df = pd.read_pickle(path)
+        if start is not None:
+            df = df[df["time"] >= utc_timestamp(start)]
+        if end is not None:
+            df = df[df["time"] < utc_timestamp(end)]
+        return df.reset_index(drop=True)
+
+    def version(self, figi, interval):
+        """
+        Cheap change marker of the stored candles, without reading them
+
+        Returns:
+            str: '<mtime_ns>-<size>' of the file, or None if nothing is stored
+        """
+        try:
+            stat = os.stat(self.path(figi, interval))
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def save(self, figi, interval, df):
+        """
+        Merge candles into the store, replacing any stored candle with the same time
+
+        Returns:
+            int: Total number of candles stored for the FIGI and interval
+        """
+        existing = self.load(figi, interval)
+        if len(existing):
+            df = pd.concat([existing, df[CANDLE_COLUMNS]], ignore_index=True)
+        else:
+            df = df[CANDLE_COLUMNS].copy()
+
+        df["time"] = pd.to_datetime(df["time"], utc=True)
+        df = df.drop_duplicates(subset="time", keep="last").sort_values("time").reset_index(drop=True)
+
+        path = self.path(figi, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_pickle(path)
+        return len(df)
+
+    def figis(self, interval):
+        """List FIGIs that have stored candles for an interval"""
+        directory = os.path.join(self.root, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith(".pkl"))
+
+    def instruments(self):
+        """Return the stored ticker -> {"figi", "name"} lookup"""
+        path = os.path.join(self.root, "instruments.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def save_instrument(self, ticker, figi, name=None):
+        """Remember the FIGI and name of a ticker so it can be resolved offline"""
+        instruments = self.instruments()
+        instruments[ticker] = {"figi": figi, "name": name or ticker}
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "instruments.json"), "w") as f:
+            json.dump(instruments, f, indent=2)
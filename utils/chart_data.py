@@ -0,0 +1,121 @@
+"""
+Chart data for the web UI: candles and strategy overlays from the candle store
+
+Responses are columnar (one array per column) and can be encoded as JSON or
+as an Arrow IPC stream (pyarrow).
+"""
+import functools
+import hashlib
+import io
+import json
+
+import numpy as np
+
+from strategies.registry import create_strategy, default_params
+from utils.candle_store import CandleStore, utc_timestamp
+from utils.helpers import downsample_candles
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+store = CandleStore()
+
+
+class ChartDataError(Exception):
+    """Raised for chart requests that cannot be served"""
+
+
+class ChartEncoderUnavailable(Exception):
+    """Raised when the encoder of a requested format is not installed on the server"""
+
+
+def resolve_figi(ticker=None, figi=None):
+    """Return the FIGI for a request given by FIGI or by a recorded ticker"""
+    if figi:
+        return figi
+    instrument = store.instruments().get(ticker)
+    if instrument is None:
+        raise ChartDataError(f"Unknown ticker {ticker}")
+    return instrument["figi"]
+
+
+def etag(*parts):
+    """Strong ETag over the stored data version and the request parameters"""
+    return '"' + hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest() + '"'
+
+
+@functools.lru_cache(maxsize=32)
+def _load(figi, interval, version):
+    # The version is part of the cache key, so a rewritten file is reloaded
+    return store.load(figi, interval)
+
+
+def load_candles(figi, interval, start=None, end=None, warmup=0):
+    """
+    Stored candles in [start, end), served from an in-memory cache
+
+    Args:
+        warmup (int): Candles before start to include as well, for indicator warm-up
+    """
+    version = store.version(figi, interval)
+    if version is None:
+        raise ChartDataError(f"No {interval} candles stored for {figi}")
+    df = _load(figi, interval, version)
+    try:
+        first = df["time"].searchsorted(utc_timestamp(start)) if start is not None else 0
+        last = df["time"].searchsorted(utc_timestamp(end)) if end is not None else len(df)
+    except ValueError as e:
+        raise ChartDataError(f"Invalid time range: {e}")
+    return df.iloc[max(first - warmup, 0):last].reset_index(drop=True)
+
+
+def candles(figi, interval, start=None, end=None, width=None):
+    """Candles downsampled to at most `width` bars"""
+    df = load_candles(figi, interval, start, end)
+    return downsample_candles(df, width) if width else df
+
+
+def signals(figi, interval, strategy_name, start=None, end=None, width=None):
+    """
+    Strategy indicator overlays and signals, computed on full resolution then downsampled
+
+    The strategy's warm-up candles before start are included in the computation
+    and trimmed afterwards, so a range matches the values over the full history.
+    """
+    try:
+        strategy = create_strategy(strategy_name, default_params())
+    except KeyError:
+        raise ChartDataError(f"Unknown strategy {strategy_name}")
+    df = load_candles(figi, interval, start, end, warmup=strategy.warmup_period())
+    result = strategy.generate_signals(df).drop(columns=["open", "high", "low", "volume"])
+    if start is not None:
+        result = result[result["time"] >= utc_timestamp(start)].reset_index(drop=True)
+    return downsample_candles(result, width) if width else result
+
+
+def to_json(df):
+    """Encode as {"columns": {name: [...]}, "rows": n} with times in epoch milliseconds"""
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if column == "time":
+            columns[column] = values.values.astype("datetime64[ms]").astype(np.int64).tolist()
+        elif values.dtype.kind == "f":
+            array = values.to_numpy()
+            columns[column] = np.where(np.isnan(array), None, array).tolist()
+        else:
+            columns[column] = values.tolist()
+    return json.dumps({"rows": len(df), "columns": columns}, separators=(",", ":"))
+
+
+def to_arrow(df):
+    """Encode as an Arrow IPC stream"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ChartEncoderUnavailable("Arrow format requires the pyarrow package, which is not installed")
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
@@ -0,0 +1,81 @@
+"""
+Warm-start checkpoints for the continuous trading bot
+
+A checkpoint holds what the bot otherwise rebuilds from the API after a
+restart: the resolved account and instrument, the candle window and the
+strategy state. It is written atomically, so a crash while saving leaves the
+previous checkpoint intact.
+"""
+import logging
+import os
+import pickle
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 2
+
+
+def checkpoint_path(ticker, interval, directory=None):
+    """Checkpoint file of a ticker and candle interval"""
+    return os.path.join(directory or config.CHECKPOINT_DIR, f"{ticker}_{interval}.pkl")
+
+
+class Checkpoint:
+    """
+    Checkpoint file of one bot
+
+    Args:
+        path (str): File path
+        max_age (float): Seconds after which a stored checkpoint is ignored
+    """
+
+    def __init__(self, path, max_age=None):
+        self.path = path
+        self.max_age = config.CHECKPOINT_MAX_AGE if max_age is None else max_age
+        self.saved_at = None
+
+    def save(self, state):
+        """Write a state dict, replacing the previous checkpoint"""
+        state = dict(state, version=CHECKPOINT_VERSION, saved_at=time.time())
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, self.path)
+        self.saved_at = state["saved_at"]
+
+    def save_if_due(self, state, interval=None):
+        """Save unless the last save was less than `interval` seconds ago"""
+        interval = config.CHECKPOINT_INTERVAL if interval is None else interval
+        if self.saved_at is None or time.time() - self.saved_at >= interval:
+            self.save(state)
+            return True
+        return False
+
+    def load(self):
+        """
+        Read the stored state
+
+        Returns:
+            dict: Saved state, or None if there is no usable checkpoint
+        """
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+
+        if state.get("version") != CHECKPOINT_VERSION:
+            logger.warning(f"Ignoring checkpoint {self.path} with version {state.get('version')}")
+            return None
+        age = time.time() - state["saved_at"]
+        if age > self.max_age:
+            logger.info(f"Ignoring checkpoint {self.path} saved {age / 3600:.1f} hours ago")
+            return None
+        return state
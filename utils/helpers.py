@@ -4,20 +4,21 @@ Helper functions for Tinkoff Invest trading bot
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
-from loguru import logger
+
+def candle_to_row(candle):
+    """Convert a single API or stream candle to a dict row"""
+    return {
+        "time": candle.time,
+        "open": float(candle.open.units) + float(candle.open.nano) / 1e9,
+        "high": float(candle.high.units) + float(candle.high.nano) / 1e9,
+        "low": float(candle.low.units) + float(candle.low.nano) / 1e9,
+        "close": float(candle.close.units) + float(candle.close.nano) / 1e9,
+        "volume": candle.volume
+    }
 
 def convert_candles_to_dataframe(candles):
     """Convert API candle response to pandas DataFrame"""
-    candle_data = []
-    for candle in candles:
-        candle_data.append({
-            "time": candle.time,
-            "open": float(candle.open.units) + float(candle.open.nano) / 1e9,
-            "high": float(candle.high.units) + float(candle.high.nano) / 1e9,
-            "low": float(candle.low.units) + float(candle.low.nano) / 1e9,
-            "close": float(candle.close.units) + float(candle.close.nano) / 1e9,
-            "volume": candle.volume
-        })
+    candle_data = [candle_to_row(candle) for candle in candles]
     
     return pd.DataFrame(candle_data)
 
@@ -53,3 +54,35 @@ def calculate_bollinger_bands(data, window=20, num_std=2):
     lower_band = ma - (std * num_std)
     
     return upper_band, ma, lower_band
+
+def downsample_candles(df, buckets):
+    """
+    Aggregate candles (and any indicator columns) into at most `buckets` rows
+    
+    OHLCV columns are aggregated as bars, 'signal' keeps the last non-zero
+    signal of each bucket and other columns keep their last value.
+    """
+    if buckets <= 0 or len(df) <= buckets:
+        return df
+    
+    starts = np.unique(np.linspace(0, len(df), buckets + 1).astype(int)[:-1])
+    ends = np.append(starts[1:], len(df)) - 1
+    
+    result = {}
+    for column in df.columns:
+        values = df[column].to_numpy()
+        if column in ("time", "open"):
+            result[column] = values[starts]
+        elif column == "high":
+            result[column] = np.maximum.reduceat(values, starts)
+        elif column == "low":
+            result[column] = np.minimum.reduceat(values, starts)
+        elif column == "volume":
+            result[column] = np.add.reduceat(values, starts)
+        elif column == "signal":
+            last_nonzero = np.maximum.reduceat(np.where(values != 0, np.arange(len(values)), -1), starts)
+            result[column] = np.where(last_nonzero >= 0, values[np.maximum(last_nonzero, 0)], 0)
+        else:
+            result[column] = values[ends]
+    
+    return pd.DataFrame(result)
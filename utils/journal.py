@@ -0,0 +1,182 @@
+"""
+Structured trade and signal journal for Tinkoff Invest trading bot
+
+Events (signals, orders, fills, cycle timings) are appended as JSON lines by
+a background thread, so recording an event never blocks the trading cycle on
+disk I/O. Files are rotated per UTC day and by size:
+
+    <directory>/2024-05-01.jsonl, 2024-05-01.1.jsonl, ...
+
+A named journal, used by each process of the sharded runner, writes its own
+files (2024-05-01.shard-0.jsonl, 2024-05-01.shard-0.1.jsonl, ...) so that
+processes never append to the same file; readers load all of a day's files.
+"""
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+import config
+
+_STOP = object()
+
+
+def _json_default(value):
+    """Serialize numpy scalars, datetimes and enums that json cannot handle"""
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "name"):
+        return value.name
+    return str(value)
+
+
+class Journal:
+    """
+    Append-only event journal with an asynchronous writer
+
+    Args:
+        directory (str): Directory of the journal files
+        max_bytes (int): Size after which the current day's file is rotated
+        name (str): Writer name added to the file names, for one journal per process
+        clock: Optional callable returning the current UTC datetime used to stamp
+            events, e.g. a simulated exchange's clock; defaults to wall-clock time
+    """
+
+    def __init__(self, directory=None, max_bytes=None, name=None, clock=None):
+        self.directory = directory or config.JOURNAL_DIR
+        self.max_bytes = max_bytes or config.JOURNAL_MAX_BYTES
+        self.name = name
+        self.clock = clock
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        self._day = None
+        self._part = 0
+        self._thread = threading.Thread(target=self._write_loop, name="journal-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, event, **fields):
+        """Queue an event for writing; returns immediately"""
+        fields["ts"] = self.clock().timestamp() if self.clock is not None else time.time()
+        fields["event"] = event
+        self._queue.put(fields)
+
+    def close(self):
+        """Flush queued events and stop the writer thread"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = _STOP in batch
+            events = [event for event in batch if event is not _STOP]
+            if events:
+                self._write(events)
+            if stop:
+                if self._file:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def _write(self, events):
+        lines = []
+        for event in events:
+            day = datetime.fromtimestamp(event["ts"], timezone.utc).strftime("%Y-%m-%d")
+            if day != self._day and lines:
+                self._flush(lines)
+                lines = []
+            self._open(day)
+            lines.append(json.dumps(event, separators=(",", ":"), default=_json_default))
+        self._flush(lines)
+
+    def _flush(self, lines):
+        if not lines:
+            return
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+        if self._file.tell() >= self.max_bytes:
+            self._part += 1
+            self._open(self._day, reopen=True)
+
+    def _open(self, day, reopen=False):
+        if day == self._day and not reopen:
+            return
+        if self._file:
+            self._file.close()
+        if day != self._day:
+            # Continue the latest part of the day if the process restarted
+            self._day = day
+            self._part = max(len(_writer_files(self.directory, day, self.name)) - 1, 0)
+        os.makedirs(self.directory, exist_ok=True)
+        stem = f"{day}.{self.name}" if self.name else day
+        suffix = f".{self._part}" if self._part else ""
+        self._file = open(os.path.join(self.directory, f"{stem}{suffix}.jsonl"), "a")
+
+
+def _writer_files(directory, day, name=None):
+    """Files of one writer for a day: its first file and its numbered parts"""
+    stem = f"{day}.{name}" if name else day
+    return (glob.glob(os.path.join(directory, f"{stem}.jsonl")) +
+            glob.glob(os.path.join(directory, f"{stem}.[0-9]*.jsonl")))
+
+
+def _day_files(directory, day):
+    return sorted(glob.glob(os.path.join(directory, f"{day}.jsonl")) +
+                  glob.glob(os.path.join(directory, f"{day}.*.jsonl")))
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    """Return the process-wide journal, starting its writer on first use"""
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = Journal()
+        return _journal
+
+
+def load_events(day, directory=None, event=None):
+    """
+    Load a day of journal events into a DataFrame
+
+    Args:
+        day (str or date): UTC day, e.g. '2024-05-01'
+        directory (str): Journal directory, defaults to config.JOURNAL_DIR
+        event (str): Optional event type filter ('signal', 'order', 'fill', 'cycle')
+
+    Returns:
+        pd.DataFrame: One row per event with a UTC 'time' column
+    """
+    import pandas as pd
+
+    if not isinstance(day, str):
+        day = day.strftime("%Y-%m-%d")
+    rows = []
+    for path in _day_files(directory or config.JOURNAL_DIR, day):
+        with open(path) as f:
+            rows.extend(json.loads(line) for line in f if line.strip())
+    if event is not None:
+        rows = [row for row in rows if row["event"] == event]
+    if not rows:
+        return pd.DataFrame(columns=["ts", "event", "time"])
+
+    df = pd.DataFrame.from_records(rows).sort_values("ts", kind="stable").reset_index(drop=True)
+    df["time"] = pd.to_datetime(df["ts"], unit="s", utc=True)
+    return df
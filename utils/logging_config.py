@@ -0,0 +1,34 @@
+"""
+Logging setup shared by the command line entry points
+"""
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+def setup_logging(level=logging.INFO):
+    """
+    Configure console and file logging
+
+    Called by entry points rather than at import time, so importing a module
+    does not open the log file. Records are handed to a QueueListener thread,
+    so logging from the trading cycle does not wait on disk or console I/O.
+    Repeated calls are no-ops.
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return
+
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [logging.FileHandler("trading_bot.log"), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
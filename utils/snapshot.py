@@ -0,0 +1,139 @@
+"""
+Per-tick market and portfolio snapshot for Tinkoff Invest trading bot
+
+Collects last prices for the whole instrument universe in batched
+get_last_prices calls and the portfolio of every account once per tick, so
+strategies and sizing code read prices and cash from memory instead of
+issuing one-element requests per order.
+"""
+import logging
+import threading
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def _to_float(value):
+    return float(value.units) + float(value.nano) / 1e9
+
+
+class MarketSnapshot:
+    """
+    Last prices and portfolios captured at one point in time
+
+    Args:
+        sandbox (bool): Read portfolios through the sandbox service
+        batch_size (int): Maximum FIGIs per get_last_prices request
+    """
+
+    def __init__(self, sandbox, batch_size=None):
+        self.sandbox = sandbox
+        self.batch_size = batch_size or config.SNAPSHOT_BATCH_SIZE
+        self.account_ids = None
+        self.prices = {}
+        self.portfolios = {}
+        self._cash = {}
+        # Fills since the snapshot, {(account_id, figi): shares}; the portfolios predate them
+        self._filled = {}
+        self._filled_lock = threading.Lock()
+        self.taken_at = None
+
+    def refresh(self, client, figis, account_ids=None):
+        """
+        Take a new snapshot
+
+        Args:
+            client: API client
+            figis (list): Instrument universe
+            account_ids (list): Accounts to load; defaults to every account returned
+                by get_accounts, resolved on the first refresh
+        """
+        started = time.perf_counter()
+        figis = list(figis)
+        with self._filled_lock:
+            counted = dict(self._filled)
+        prices = {}
+        for start in range(0, len(figis), self.batch_size):
+            response = client.market_data.get_last_prices(figi=figis[start:start + self.batch_size])
+            for last_price in response.last_prices:
+                prices[last_price.figi] = _to_float(last_price.price)
+
+        if account_ids is None:
+            if self.account_ids is None:
+                self.account_ids = [account.id for account in client.users.get_accounts().accounts]
+            account_ids = self.account_ids
+
+        portfolios = {}
+        for account_id in account_ids:
+            if self.sandbox:
+                portfolios[account_id] = client.sandbox.get_sandbox_portfolio(account_id=account_id)
+            else:
+                portfolios[account_id] = client.operations.get_portfolio(account_id=account_id)
+
+        self.prices = prices
+        self.portfolios = portfolios
+        self._cash = {
+            account_id: sum(_to_float(position.quantity) for position in portfolio.positions
+                            if position.instrument_type == "currency")
+            for account_id, portfolio in portfolios.items()
+        }
+        # Fills recorded before the portfolios were read are part of them now. Fills that
+        # arrived during the read are kept, at worst counting them twice until the next refresh
+        with self._filled_lock:
+            for key, quantity in counted.items():
+                self._filled[key] -= quantity
+                if not self._filled[key]:
+                    del self._filled[key]
+        self.taken_at = time.time()
+        logger.debug(f"Snapshot of {len(prices)} prices and {len(portfolios)} portfolios "
+                     f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def refresh_if_stale(self, client, figis, account_ids=None, max_age=None):
+        """Refresh only when the snapshot is older than max_age seconds"""
+        max_age = config.SNAPSHOT_MAX_AGE if max_age is None else max_age
+        if self.taken_at is None or time.time() - self.taken_at >= max_age:
+            self.refresh(client, figis, account_ids)
+
+    def last_price(self, figi):
+        """Last price of an instrument, or None if it was not in the snapshot"""
+        return self.prices.get(figi)
+
+    def cash(self, account_id):
+        """Currency balance of an account, net of cash committed since the snapshot"""
+        return self._cash.get(account_id)
+
+    def position(self, account_id, figi):
+        """Quantity of an instrument held by an account, including fills since the snapshot"""
+        portfolio = self.portfolios.get(account_id)
+        if portfolio is None:
+            return None
+        held = 0
+        for position in portfolio.positions:
+            if position.figi == figi:
+                held = int(_to_float(position.quantity))
+                break
+        return held + self._filled.get((account_id, figi), 0)
+
+    def apply_fill(self, account_id, figi, quantity):
+        """
+        Record a fill made after the snapshot was taken
+
+        Args:
+            account_id (str): Account of the order
+            figi (str): Instrument FIGI
+            quantity (int): Executed shares, negative for sells
+        """
+        with self._filled_lock:
+            key = (account_id, figi)
+            self._filled[key] = self._filled.get(key, 0) + quantity
+
+    def has(self, figi, account_id):
+        """True when both the instrument's price and the account's portfolio are available"""
+        return figi in self.prices and account_id in self.portfolios
+
+    def commit_cash(self, account_id, amount):
+        """Deduct cash assigned to an order so later sizing in the same tick does not reuse it"""
+        if account_id in self._cash:
+            self._cash[account_id] -= amount
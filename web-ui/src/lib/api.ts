@@ -51,3 +51,62 @@ export async function createAccount(): Promise<ApiResponse> {
     return { status: 'error', message: 'Failed to create account' };
   }
 }
+
+// Columnar chart data: one array per column, times in epoch milliseconds
+export interface ChartData {
+  rows: number;
+  columns: Record<string, (number | null)[]>;
+}
+
+export interface ChartQuery {
+  ticker?: string;
+  figi?: string;
+  interval?: '1m' | '5m' | '15m' | '1h';
+  start?: string;
+  end?: string;
+  width?: number;
+  strategy?: string;
+}
+
+// ETag and data of the last response per URL, for conditional requests
+const chartCache = new Map<string, { etag: string; data: ChartData }>();
+
+async function fetchChartData(path: string, query: ChartQuery): Promise<ChartData | null> {
+  const params = new URLSearchParams();
+  Object.entries(query).forEach(([key, value]) => {
+    if (value !== undefined) params.set(key, String(value));
+  });
+  const url = `${API_URL}${path}?${params}`;
+  const cached = chartCache.get(url);
+
+  try {
+    const response = await fetch(url, {
+      headers: cached ? { 'If-None-Match': cached.etag } : {},
+    });
+    if (response.status === 304 && cached) {
+      return cached.data;
+    }
+    if (!response.ok) {
+      throw new Error(`API error: ${response.status}`);
+    }
+    const data = await response.json() as ChartData;
+    const etag = response.headers.get('ETag');
+    if (etag) {
+      chartCache.set(url, { etag, data });
+    }
+    return data;
+  } catch (error) {
+    console.error(`Failed to fetch ${path}:`, error);
+    return null;
+  }
+}
+
+// Candles downsampled on the server to the chart width in pixels
+export async function getCandles(query: ChartQuery): Promise<ChartData | null> {
+  return fetchChartData('/candles', query);
+}
+
+// Strategy indicator overlays and signals
+export async function getSignals(query: ChartQuery): Promise<ChartData | null> {
+  return fetchChartData('/signals', query);
+}